@@ -2,12 +2,28 @@ import pygame
 import random
 import heapq
 from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import multiprocessing
+from multiprocessing import shared_memory
+from array import array
 import math
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Maze settings
 ROWS, COLS = 31, 31
 TILE_SIZE = 25
 WIDTH, HEIGHT = COLS * TILE_SIZE, ROWS * TILE_SIZE
+MIN_TILE_SIZE = 8  # Tiles never shrink below this; larger mazes scroll instead
+CAMERA_MARGIN = 1  # Tiles drawn past each edge of the screen
+DETAIL_MIN_TILE = 12  # Smaller tiles are drawn from the scaled maze overview instead of one by one
+MINIMAP_SIZE = 150  # Longest side of the whole-maze minimap in pixels
+IDLE_FRAME_MS = 100  # Longest a menu or overlay sleeps waiting for input before animating
 
 # Colors
 WHITE = (255, 255, 255)
@@ -25,13 +41,104 @@ DARK_GREEN = (0, 100, 0)
 PINK = (255, 105, 180)      # Color for killer obstacles
 LIGHT_BLUE = (173, 216, 230) # Color for power-ups
 
+# Pathfinding settings
+JOURNAL_LIMIT = 4096  # Wall changes a maze remembers before caches rebuild from scratch
+LANDMARK_ANCHORS = 5  # Four corners plus the centre
+LANDMARK_REPAIR_SHARE = 8  # A landmark field is repaired in place while under 1/8 of it changes, else rebuilt
+LANDMARK_REPAIR_MIN = 256  # Cells any repair may touch, however small the maze
+CLUSTER_SIZE = 16  # Side length of a hierarchical planning cluster
+HIERARCHICAL_MIN_CELLS = 250 * 250  # Mazes this large plan through clusters instead of the full grid
+MAZE_UPDATE_BUDGET_MS = 4  # Time each frame may spend on a pending maze modification
+SIM_STEP_MS = 10  # Game time covered by one simulation step
+MAX_SIM_STEPS = 12  # Most steps one frame runs to catch up before dropping the backlog
+ANYTIME_START_WEIGHT = 2.5  # Heuristic inflation for the first, fastest anytime A* pass
+ANYTIME_WEIGHT_STEP = 0.5  # How much each further anytime pass lowers the weight
+ANYTIME_BUDGET_MS = 3  # Time a hint or AI search on a very large maze gets before taking its best path so far
+DANGER_RADIUS = 3  # Steps from a killer obstacle that still cost the AI extra
+DANGER_COST = 4  # Extra cost per step of closeness inside that radius
+SHIFT_CHECK_MARGIN = 6  # Cells around a shifted wall searched for a local way round it
+
+# AI lookahead settings
+LOOKAHEAD_MIN_LEVEL = 6  # From this level the AI chooses its smart moves by simulated rollouts
+LOOKAHEAD_BUDGET_MS = 6  # Time spent on rollouts before each AI move
+LOOKAHEAD_SLACK_MS = 2  # Part of that budget left for worker processes to start and hand their results back
+LOOKAHEAD_HORIZON_MS = 3000  # Game time each rollout plays ahead
+LOOKAHEAD_EXPLORE = 0.2  # Chance a rollout step ignores the distance to the exit
+LOOKAHEAD_WORKERS = 3  # Most extra processes running rollouts alongside the main thread
+LOOKAHEAD_ROLLOUTS = 24  # Rollouts per move in place of the time budget when a run has to repeat exactly
+
 directions = [(-2, 0), (2, 0), (0, -2), (0, 2)]
 
+class RandomStreams:
+    """One generator per subsystem, all derived from a single seed, so draws in one never shift another's"""
+    NAMES = ('maze', 'layout', 'ai', 'obstacles', 'walls')
+    
+    def __init__(self, seed=None):
+        self.reseed(seed)
+    
+    def reseed(self, seed=None):
+        """Restart every stream from seed, or from a fresh random seed; returns the seed used"""
+        self.seed = random.getrandbits(63) if seed is None else seed
+        for index, name in enumerate(self.NAMES):
+            setattr(self, name, random.Random(self.seed * len(self.NAMES) + index))
+        return self.seed
+
+# Random streams the game draws from: maze carving and changes, where things are placed,
+# AI decisions, obstacle wandering and shifting walls
+rng = RandomStreams()
+
 def is_valid(x, y, rows=None, cols=None):
     if rows is None:
         rows, cols = ROWS, COLS
     return 0 <= x < rows and 0 <= y < cols
 
+class MazeGrid(list):
+    """List-of-rows maze that journals wall changes so path caches know when they are stale"""
+    def __init__(self, rows=()):
+        super().__init__(rows)
+        self.version = 0  # Bumped on every wall change
+        self.journal = deque(maxlen=JOURNAL_LIMIT)  # (version, cell) per wall change
+        self.caches = {}  # Derived search structures, keyed by name
+        self.owned = None  # Rows safe to write in place once snapshots exist, None while nothing is shared
+
+    def snapshot(self):
+        """Copy-on-write clone that shares every row until either side writes to it"""
+        clone = MazeGrid(self)
+        clone.version = self.version
+        clone.owned = set()
+        self.owned = set()
+        return clone
+
+    def set_cell(self, x, y, value):
+        row = self[x]
+        if self.owned is not None and x not in self.owned:
+            # The row may be shared with a snapshot, so write to a private copy
+            row = list(row)
+            self[x] = row
+            self.owned.add(x)
+        was_wall = row[y] == '#'
+        row[y] = value
+
+        # Only walls matter to pathfinding, items and obstacles are passable
+        if was_wall != (value == '#'):
+            self.version += 1
+            self.journal.append((self.version, (x, y)))
+
+    def changes_since(self, version):
+        """Cells whose wall state changed after version, or None if the journal no longer reaches back"""
+        if version == self.version:
+            return []
+        if not self.journal or self.journal[0][0] > version + 1:
+            return None
+        return [cell for v, cell in self.journal if v > version]
+
+def set_cell(maze, x, y, value):
+    """Write a maze cell, journaling the change when the maze tracks versions"""
+    if isinstance(maze, MazeGrid):
+        maze.set_cell(x, y, value)
+    else:
+        maze[x][y] = value
+
 def generate_dynamic_maze():
     # Initialize maze with walls
     maze = [['#' for _ in range(COLS)] for _ in range(ROWS)]
@@ -39,7 +146,7 @@ def generate_dynamic_maze():
     # Function to carve paths using recursive backtracking
     def carve_maze(x, y):
         maze[x][y] = ' '
-        random.shuffle(directions)
+        rng.maze.shuffle(directions)
         for dx, dy in directions:
             nx, ny = x + dx, y + dy
             if is_valid(nx, ny) and maze[nx][ny] == '#':
@@ -47,14 +154,14 @@ def generate_dynamic_maze():
                 carve_maze(nx, ny)
     
     # Generate base perfect maze
-    start_x, start_y = random.randrange(1, ROWS, 2), random.randrange(1, COLS, 2)
+    start_x, start_y = rng.maze.randrange(1, ROWS, 2), rng.maze.randrange(1, COLS, 2)
     carve_maze(start_x, start_y)
     
     # Add random paths to create loops
     extra_paths = int((ROWS * COLS) * 0.15)
     for _ in range(extra_paths):
-        x = random.randrange(1, ROWS - 1)
-        y = random.randrange(1, COLS - 1)
+        x = rng.maze.randrange(1, ROWS - 1)
+        y = rng.maze.randrange(1, COLS - 1)
         
         # Only remove walls between existing paths
         if maze[x][y] == '#':
@@ -76,12 +183,15 @@ def generate_dynamic_maze():
     maze[1][0] = 'S'
     maze[ROWS - 2][COLS - 1] = 'E'
     
-    return maze
+    return MazeGrid(maze)
 
 def manhattan_distance(p1, p2):
     return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
 
-def bfs(maze, start, end):
+def bfs(maze, start, end, graph=None):
+    if graph is not None and graph.can_route(start, end):
+        return graph.find_path(start, end)
+
     rows, cols = len(maze), len(maze[0])
     queue = deque([(start, [start])])
     visited = set([start])
@@ -100,10 +210,544 @@ def bfs(maze, start, end):
 
     return None
 
-def astar(maze, start, end, ignore_walls=False):
+def distance_field(maze, sources, graph=None):
+    """Multi-source BFS distances as a flat row-major array, -1 for walls and unreachable cells"""
+    if graph is not None and sources and all(graph.contains(source) for source in sources):
+        return graph.distance_field(sources)
+
     rows, cols = len(maze), len(maze[0])
-    
-    open_set = [(0 + manhattan_distance(start, end), 0, start, [start])]
+    dist = array('i', [-1]) * (rows * cols)
+    queue = deque()
+
+    for x, y in sources:
+        if 0 <= x < rows and 0 <= y < cols and maze[x][y] != '#' and dist[x * cols + y] < 0:
+            dist[x * cols + y] = 0
+            queue.append((x, y))
+
+    while queue:
+        x, y = queue.popleft()
+        d = dist[x * cols + y] + 1
+
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols and maze[nx][ny] != '#' and dist[nx * cols + ny] < 0:
+                dist[nx * cols + ny] = d
+                queue.append((nx, ny))
+
+    return dist
+
+def distance_matrix(maze, targets, graph=None):
+    """One distance field per target, so the distance from any cell to any target is a single lookup"""
+    if graph is not None and targets and all(graph.contains(target) for target in targets):
+        return [graph.distance_field([target]) for target in targets]
+
+    # All targets search together in one pass (MS-BFS): each cell keeps a bit per search that has reached
+    # it, and a cell several searches reach on the same level is expanded once for all of them
+    rows, cols = len(maze), len(maze[0])
+    size = rows * cols
+    fields = [array('i', [-1]) * size for _ in targets]
+    is_open = [cell != '#' for row in maze for cell in row]
+    seen = [0] * size  # Searches that have reached each cell
+    arriving = [0] * size  # Searches reaching each cell on the level being built
+    frontier = []
+    for k, (x, y) in enumerate(targets):
+        i = x * cols + y
+        if 0 <= x < rows and 0 <= y < cols and is_open[i]:
+            if not arriving[i]:
+                frontier.append(i)
+            seen[i] |= 1 << k
+            arriving[i] |= 1 << k
+            fields[k][i] = 0
+
+    d = 0
+    while frontier:
+        d += 1
+        level = [(i, arriving[i]) for i in frontier]
+        for i in frontier:
+            arriving[i] = 0
+        frontier = []
+        for i, bits in level:
+            y = i % cols
+            for j in (i - cols, i + cols, i - 1 if y > 0 else -1, i + 1 if y < cols - 1 else -1):
+                if 0 <= j < size and is_open[j]:
+                    new = bits & ~seen[j]
+                    if new:
+                        if not arriving[j]:
+                            frontier.append(j)
+                        seen[j] |= new
+                        arriving[j] |= new
+        for j in frontier:
+            bits, k = arriving[j], 0
+            while bits:
+                if bits & 1:
+                    fields[k][j] = d
+                bits >>= 1
+                k += 1
+
+    return fields
+
+def field_of_view(maze, origin, radius):
+    """Cells visible from origin within radius by recursive shadowcasting; walls block sight but are seen"""
+    rows, cols = len(maze), len(maze[0])
+    ox, oy = origin
+    visible = {tuple(origin)}
+
+    def cast(row, start, end, xx, xy, yx, yy):
+        # Scan one octant row by row, narrowing the lit slope range at each wall
+        if start < end:
+            return
+        new_start = start
+        for j in range(row, radius + 1):
+            dx, dy = -j - 1, -j
+            blocked = False
+            while dx <= 0:
+                dx += 1
+                x, y = ox + dx * xx + dy * xy, oy + dx * yx + dy * yy
+                left_slope = (dx - 0.5) / (dy + 0.5)
+                right_slope = (dx + 0.5) / (dy - 0.5)
+                if start < right_slope:
+                    continue
+                if end > left_slope:
+                    break
+
+                inside = 0 <= x < rows and 0 <= y < cols
+                if inside and dx * dx + dy * dy <= radius * radius:
+                    visible.add((x, y))
+
+                opaque = not inside or maze[x][y] == '#'
+                if blocked:
+                    if opaque:
+                        new_start = right_slope
+                    else:
+                        blocked = False
+                        start = new_start
+                elif opaque and j < radius:
+                    blocked = True
+                    cast(j + 1, start, left_slope, xx, xy, yx, yy)
+                    new_start = right_slope
+            if blocked:
+                break
+
+    for xx, xy, yx, yy in [(1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+                           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)]:
+        cast(1, 1.0, 0.0, xx, xy, yx, yy)
+    return frozenset(visible)
+
+def get_field_of_view(maze, origin, radius):
+    """field_of_view, cached per cell and radius until the maze's walls change"""
+    if not isinstance(maze, MazeGrid):
+        return field_of_view(maze, origin, radius)
+
+    version, views = maze.caches.get('fov', (None, None))
+    if version != maze.version:
+        views = {}
+        maze.caches['fov'] = (maze.version, views)
+    key = (tuple(origin), radius)
+    view = views.get(key)
+    if view is None:
+        view = views[key] = field_of_view(maze, key[0], radius)
+    return view
+
+class LandmarkTable:
+    """BFS distances from a few corner and centre landmarks, giving A* a tight ALT heuristic"""
+    def __init__(self, maze):
+        self.rows, self.cols = len(maze), len(maze[0])
+        self.version = getattr(maze, 'version', 0)
+        self.landmarks = self.pick_landmarks(maze)
+        self.distances = [None] * len(self.landmarks)  # None until fill() builds that landmark's field
+        self.live = []  # The fields built so far, which the heuristic uses
+        self.rebuilding = False  # A fill() is queued on a background thread
+
+    def pick_landmarks(self, maze):
+        """Open cells nearest to each corner and the centre"""
+        anchors = [(1, 1), (1, self.cols - 2), (self.rows - 2, 1),
+                   (self.rows - 2, self.cols - 2), (self.rows // 2, self.cols // 2)]
+        landmarks = []
+
+        for ax, ay in anchors[:LANDMARK_ANCHORS]:
+            # Search outwards in growing squares for the first open cell
+            for r in range(max(self.rows, self.cols)):
+                found = None
+                for x in range(ax - r, ax + r + 1):
+                    for y in range(ay - r, ay + r + 1):
+                        if (max(abs(x - ax), abs(y - ay)) == r and
+                            is_valid(x, y, self.rows, self.cols) and maze[x][y] != '#'):
+                            found = (x, y)
+                            break
+                    if found:
+                        break
+                if found:
+                    if found not in landmarks:
+                        landmarks.append(found)
+                    break
+
+        return landmarks
+
+    def heuristic(self, a, b):
+        """Admissible distance estimate via the triangle inequality, never weaker than Manhattan"""
+        best = abs(a[0] - b[0]) + abs(a[1] - b[1])
+        ia = a[0] * self.cols + a[1]
+        ib = b[0] * self.cols + b[1]
+
+        for dist in self.live:
+            da, db = dist[ia], dist[ib]
+            if da >= 0 and db >= 0:
+                d = da - db if da > db else db - da
+                if d > best:
+                    best = d
+
+        return best
+
+    def sync(self, maze):
+        """Keep every field that is still admissible for maze's walls; True if any now needs building"""
+        if maze.version != self.version:
+            changed = maze.changes_since(self.version)
+            for k, dist in enumerate(self.distances):
+                if dist is not None and (changed is None or not self.absorb(maze, dist, changed)):
+                    self.distances[k] = None
+            self.version = maze.version
+            self.live = [dist for dist in self.distances if dist is not None]
+        return len(self.live) < len(self.distances)
+
+    def absorb(self, maze, dist, changed):
+        """Repair dist for cells opened since it was built, or False if too much of it would change"""
+        # Added walls only lengthen routes, so old distances stay exact for the maze with those cells
+        # still open, and remain lower bounds. Opened cells can only bring cells closer, from where they are.
+        rows, cols = self.rows, self.cols
+        frontier = []
+        for x, y in changed:
+            if maze[x][y] == '#' or dist[x * cols + y] >= 0:
+                continue
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if 0 <= nx < rows and 0 <= ny < cols and dist[nx * cols + ny] >= 0:
+                    heapq.heappush(frontier, (dist[nx * cols + ny] + 1, (x, y)))
+
+        budget = max(LANDMARK_REPAIR_MIN, rows * cols // LANDMARK_REPAIR_SHARE)
+        while frontier:
+            d, (x, y) = heapq.heappop(frontier)
+            i = x * cols + y
+            if 0 <= dist[i] <= d:
+                continue
+            dist[i] = d
+            budget -= 1
+            if budget < 0:
+                return False  # Cheaper to search again from the landmark
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if 0 <= nx < rows and 0 <= ny < cols:
+                    near = dist[nx * cols + ny]
+                    if (near < 0 and maze[nx][ny] != '#') or near > d + 1:
+                        heapq.heappush(frontier, (d + 1, (nx, ny)))
+        return True
+
+    def fill(self, maze):
+        """Build the fields sync() dropped, for maze as it is now"""
+        self.sync(maze)
+        for k, landmark in enumerate(self.landmarks):
+            if self.distances[k] is None:
+                self.distances[k] = distance_field(maze, [landmark])
+        self.live = list(self.distances)
+        self.rebuilding = False
+
+def known_landmark_table(maze):
+    """The landmark table with whatever fields are still admissible, building none; None if there is none"""
+    table = maze.caches.get('landmarks') if isinstance(maze, MazeGrid) else None
+    if table is None or (len(maze), len(maze[0])) != (table.rows, table.cols):
+        return None
+    table.sync(maze)
+    return table
+
+def get_landmark_table(maze, rebuild=None):
+    """Return a landmark table admissible for maze's current walls, or None for untracked mazes;
+    with an executor, fields a wall change spoiled are rebuilt on it while the rest keep serving"""
+    if not isinstance(maze, MazeGrid):
+        return None
+
+    table = maze.caches.get('landmarks')
+    if table is None or (len(maze), len(maze[0])) != (table.rows, table.cols):
+        table = LandmarkTable(maze)
+        maze.caches['landmarks'] = table
+    if table.sync(maze):
+        if rebuild is None:
+            table.fill(maze)
+        elif not table.rebuilding:
+            table.rebuilding = True
+            rebuild.submit(table.fill, maze)
+    return table
+
+class JunctionGraph:
+    """Corridor-contracted view of a maze: junctions and dead ends joined by weighted corridor edges"""
+    def __init__(self, maze):
+        self.build(maze)
+
+    def build(self, maze):
+        self.rows, self.cols = len(maze), len(maze[0])
+        self.version = getattr(maze, 'version', 0)
+        self.adjacency = {}  # node -> {first cell towards neighbour: edge id}
+        self.edges = {}      # edge id -> (node a, node b, corridor cells from a to b)
+        self.cell_edge = {}  # corridor cell -> (edge id, index in corridor)
+        self.next_edge_id = 0
+
+        for x in range(self.rows):
+            for y in range(self.cols):
+                if self.is_node(maze, x, y):
+                    self.adjacency[(x, y)] = {}
+
+        for node in list(self.adjacency):
+            self.trace_edges(maze, node)
+
+    def open_neighbors(self, maze, x, y):
+        neighbors = []
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.rows and 0 <= ny < self.cols and maze[nx][ny] != '#':
+                neighbors.append((nx, ny))
+        return neighbors
+
+    def is_node(self, maze, x, y):
+        """Junctions and dead ends are nodes, cells with exactly two exits are corridor"""
+        return maze[x][y] != '#' and len(self.open_neighbors(maze, x, y)) != 2
+
+    def trace_edges(self, maze, node):
+        """Follow every untraced corridor leaving node and add it as an edge"""
+        for first in self.open_neighbors(maze, *node):
+            if first in self.adjacency[node]:
+                continue
+
+            prev, current, cells = node, first, []
+            while current not in self.adjacency:
+                cells.append(current)
+                step = [n for n in self.open_neighbors(maze, *current) if n != prev]
+                prev, current = current, step[0]
+
+            self.add_edge(node, current, cells)
+
+    def add_edge(self, a, b, cells):
+        edge_id = self.next_edge_id
+        self.next_edge_id += 1
+        self.edges[edge_id] = (a, b, cells)
+        self.adjacency[a][cells[0] if cells else b] = edge_id
+        self.adjacency[b][cells[-1] if cells else a] = edge_id
+        for i, cell in enumerate(cells):
+            self.cell_edge[cell] = (edge_id, i)
+
+    def remove_edge(self, edge_id, touched):
+        a, b, cells = self.edges.pop(edge_id)
+        for node, first in [(a, cells[0] if cells else b), (b, cells[-1] if cells else a)]:
+            if node in self.adjacency and self.adjacency[node].get(first) == edge_id:
+                del self.adjacency[node][first]
+                touched.add(node)
+        for cell in cells:
+            self.cell_edge.pop(cell, None)
+
+    def apply_changes(self, maze, changed):
+        """Re-contract only the corridors around cells whose wall state changed"""
+        dirty = set()
+        for x, y in changed:
+            dirty.add((x, y))
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                if is_valid(x + dx, y + dy, self.rows, self.cols):
+                    dirty.add((x + dx, y + dy))
+
+        # Drop every node and corridor that runs through the changed area
+        touched = set()
+        for cell in dirty:
+            if cell in self.cell_edge:
+                self.remove_edge(self.cell_edge[cell][0], touched)
+            if cell in self.adjacency:
+                for edge_id in list(self.adjacency[cell].values()):
+                    if edge_id in self.edges:
+                        self.remove_edge(edge_id, touched)
+                del self.adjacency[cell]
+
+        for x, y in dirty:
+            if self.is_node(maze, x, y):
+                self.adjacency[(x, y)] = {}
+                touched.add((x, y))
+
+        # Retrace from the surviving ends of the removed corridors
+        for node in touched:
+            if node in self.adjacency:
+                self.trace_edges(maze, node)
+
+    def sync(self, maze):
+        """Bring the graph up to date with maze's change journal"""
+        if (len(maze), len(maze[0])) != (self.rows, self.cols):
+            self.build(maze)
+            return
+
+        changed = maze.changes_since(self.version)
+        if changed is None:
+            self.build(maze)
+        elif changed:
+            self.apply_changes(maze, changed)
+        self.version = maze.version
+
+    def attachments(self, cell):
+        """(node, cost, corridor cells from cell to node) for the nodes a cell can reach directly"""
+        if cell in self.adjacency:
+            return [(cell, 0, [])]
+
+        edge_id, i = self.cell_edge[cell]
+        a, b, cells = self.edges[edge_id]
+        return [(a, i + 1, cells[i - 1::-1] if i > 0 else []),
+                (b, len(cells) - i, cells[i + 1:])]
+
+    def contains(self, cell):
+        """Cells on corridor loops with no junction are not part of the graph"""
+        cell = tuple(cell)
+        return cell in self.adjacency or cell in self.cell_edge
+
+    def can_route(self, start, end):
+        return self.contains(start) and self.contains(end)
+
+    def find_path(self, start, end, heuristic=None):
+        """Shortest cell path between two routable cells, searching corridor edges instead of cells"""
+        start, end = tuple(start), tuple(end)
+        if start == end:
+            return [start]
+        if heuristic is None:
+            heuristic = manhattan_distance
+
+        # Cells on the same corridor can also walk straight along it
+        best_cost, best_node, direct = float('inf'), None, None
+        if start in self.cell_edge and end in self.cell_edge:
+            (edge_s, i), (edge_e, j) = self.cell_edge[start], self.cell_edge[end]
+            if edge_s == edge_e:
+                cells = self.edges[edge_s][2]
+                direct = cells[i:j + 1] if i < j else cells[j:i + 1][::-1]
+                best_cost = len(direct) - 1
+
+        goal_links = {}  # node -> (cost, corridor cells from end to node)
+        for node, cost, cells in self.attachments(end):
+            if node not in goal_links or cost < goal_links[node][0]:
+                goal_links[node] = (cost, cells)
+
+        g = {}
+        parent = {}  # node -> (previous node or None, corridor cells in between)
+        open_set = []
+        for node, cost, cells in self.attachments(start):
+            if cost < g.get(node, float('inf')):
+                g[node] = cost
+                parent[node] = (None, cells)
+                heapq.heappush(open_set, (cost + heuristic(node, end), cost, node))
+
+        while open_set:
+            f, cost, node = heapq.heappop(open_set)
+            if cost > g[node]:
+                continue
+            if f >= best_cost:
+                break
+
+            if node in goal_links and cost + goal_links[node][0] < best_cost:
+                best_cost, best_node = cost + goal_links[node][0], node
+
+            for edge_id in self.adjacency[node].values():
+                a, b, cells = self.edges[edge_id]
+                if a == b:
+                    continue
+                other, between = (b, cells) if a == node else (a, cells[::-1])
+                new_cost = cost + len(cells) + 1
+                if new_cost < g.get(other, float('inf')):
+                    g[other] = new_cost
+                    parent[other] = (node, between)
+                    heapq.heappush(open_set, (new_cost + heuristic(other, end), new_cost, other))
+
+        if best_node is None:
+            return direct
+
+        # Expand the node chain back into cells
+        segments = []
+        if best_node != end:
+            segments.append([end])
+            segments.append(goal_links[best_node][1])
+        node = best_node
+        while node is not None:
+            prev, between = parent[node]
+            segments.append([node])
+            segments.append(between[::-1])
+            node = prev
+        path = [cell for segment in segments for cell in segment]
+        if path[-1] != start:
+            path.append(start)
+        path.reverse()
+        return path
+
+    def distance_field(self, sources):
+        """Same result as the grid distance_field, relaxing edges instead of cells"""
+        dist = array('i', [-1]) * (self.rows * self.cols)
+        best = {}
+        open_set = []
+        direct = []
+
+        for source in sources:
+            source = tuple(source)
+            for node, cost, cells in self.attachments(source):
+                if cost < best.get(node, float('inf')):
+                    best[node] = cost
+                    heapq.heappush(open_set, (cost, node))
+            if source in self.cell_edge:
+                direct.append(self.cell_edge[source])
+
+        while open_set:
+            cost, node = heapq.heappop(open_set)
+            if cost > best[node]:
+                continue
+            for edge_id in self.adjacency[node].values():
+                a, b, cells = self.edges[edge_id]
+                other = b if a == node else a
+                new_cost = cost + len(cells) + 1
+                if new_cost < best.get(other, float('inf')):
+                    best[other] = new_cost
+                    heapq.heappush(open_set, (new_cost, other))
+
+        for (x, y), cost in best.items():
+            dist[x * self.cols + y] = cost
+
+        # Corridor cells take the nearer end, or a source on the same corridor
+        inf = float('inf')
+        for edge_id, (a, b, cells) in self.edges.items():
+            da, db = best.get(a, inf), best.get(b, inf)
+            length = len(cells)
+            for i, (x, y) in enumerate(cells):
+                d = min(da + i + 1, db + length - i)
+                if d < inf:
+                    dist[x * self.cols + y] = d
+        for edge_id, i in direct:
+            cells = self.edges[edge_id][2]
+            for k, (x, y) in enumerate(cells):
+                idx = x * self.cols + y
+                d = abs(k - i)
+                if dist[idx] < 0 or d < dist[idx]:
+                    dist[idx] = d
+
+        return dist
+
+def get_junction_graph(maze):
+    """Return the junction graph for maze, updated from its change journal, or None for untracked mazes"""
+    if not isinstance(maze, MazeGrid):
+        return None
+
+    graph = maze.caches.get('junctions')
+    if graph is None:
+        graph = JunctionGraph(maze)
+        maze.caches['junctions'] = graph
+    else:
+        graph.sync(maze)
+    return graph
+
+def astar(maze, start, end, ignore_walls=False, landmarks=None, graph=None):
+    rows, cols = len(maze), len(maze[0])
+
+    # Landmark distances and the junction graph both assume walls block movement
+    if landmarks is not None and not ignore_walls:
+        heuristic = landmarks.heuristic
+    else:
+        heuristic = manhattan_distance
+
+    if graph is not None and not ignore_walls and graph.can_route(start, end):
+        return graph.find_path(start, end, heuristic)
+
+    open_set = [(0 + heuristic(start, end), 0, start, [start])]
     closed_set = set()
     
     while open_set:
@@ -131,76 +775,1014 @@ def astar(maze, start, end, ignore_walls=False):
                 continue
                 
             new_g = g + 1
-            h = manhattan_distance(neighbor, end)
+            h = heuristic(neighbor, end)
             f = new_g + h
             
             heapq.heappush(open_set, (f, new_g, neighbor, path + [neighbor]))
     
     return None
 
+def anytime_astar(maze, start, end, deadline, weight=ANYTIME_START_WEIGHT, landmarks=None, cost=None):
+    """ARA*: a quick weight-inflated path, improved by reusing the search until deadline (a perf_counter time);
+    with a cost array, entering a cell costs 1 plus its entry, as in weighted_astar"""
+    # The first path is always finished so there is something to return; a pass at weight 1 is optimal
+    rows, cols = len(maze), len(maze[0])
+    heuristic = landmarks.heuristic if landmarks is not None else manhattan_distance
+    unreached = float('inf')  # Inflated f values can pass any finite bound
+
+    g = {start: 0}
+    parent = {start: None}
+    open_set = [(weight * heuristic(start, end), start)]
+    closed_set = set()
+    inconsistent = set()  # Closed cells whose g improved during this pass
+    best = None
+    expanded = 0
+
+    while True:
+        # Expand until nothing left in the open set could beat the current path to end
+        while open_set and open_set[0][0] < g.get(end, unreached):
+            f, current = heapq.heappop(open_set)
+            if current in closed_set:
+                continue
+            closed_set.add(current)
+
+            expanded += 1
+            if best is not None and expanded % 256 == 0 and time.perf_counter() > deadline:
+                return best
+
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                neighbor = (current[0] + dx, current[1] + dy)
+                if not (0 <= neighbor[0] < rows and 0 <= neighbor[1] < cols):
+                    continue
+                if maze[neighbor[0]][neighbor[1]] == '#':
+                    continue
+                next_g = g[current] + 1
+                if cost is not None:
+                    next_g += cost[neighbor[0] * cols + neighbor[1]]
+                if next_g < g.get(neighbor, unreached):
+                    g[neighbor] = next_g
+                    parent[neighbor] = current
+                    if neighbor in closed_set:
+                        inconsistent.add(neighbor)
+                    else:
+                        heapq.heappush(open_set, (next_g + weight * heuristic(neighbor, end), neighbor))
+
+        if end not in g:
+            return None
+
+        path = []
+        cell = end
+        while cell is not None:
+            path.append(cell)
+            cell = parent[cell]
+        best = path[::-1]
+
+        if weight <= 1 or time.perf_counter() > deadline:
+            return best
+
+        # Tighten the bound and carry the frontier over instead of starting again
+        weight = max(1, weight - ANYTIME_WEIGHT_STEP)
+        frontier = {cell for f, cell in open_set if cell not in closed_set} | inconsistent
+        open_set = [(g[cell] + weight * heuristic(cell, end), cell) for cell in frontier]
+        heapq.heapify(open_set)
+        closed_set = set()
+        inconsistent = set()
+
+def weighted_astar(maze, start, end, cost, landmarks=None):
+    """A* where entering a cell costs 1 plus its entry in the flat row-major cost array"""
+    rows, cols = len(maze), len(maze[0])
+    heuristic = landmarks.heuristic if landmarks is not None else manhattan_distance
+
+    # Every step costs at least 1, so the unweighted heuristics stay admissible
+    g = {start: 0}
+    parent = {start: None}
+    open_set = [(heuristic(start, end), start)]
+    closed_set = set()
+
+    while open_set:
+        f, current = heapq.heappop(open_set)
+        if current == end:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = parent[current]
+            return path[::-1]
+        if current in closed_set:
+            continue
+        closed_set.add(current)
+
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            nx, ny = current[0] + dx, current[1] + dy
+            if not (0 <= nx < rows and 0 <= ny < cols) or maze[nx][ny] == '#':
+                continue
+            neighbor = (nx, ny)
+            new_g = g[current] + 1 + cost[nx * cols + ny]
+            if new_g < g.get(neighbor, new_g + 1):
+                g[neighbor] = new_g
+                parent[neighbor] = current
+                heapq.heappush(open_set, (new_g + heuristic(neighbor, end), neighbor))
+
+    return None
+
+class DangerField:
+    """Extra step cost around killer obstacles, restamped only where a killer has moved"""
+    def __init__(self, rows, cols):
+        self.rows, self.cols = rows, cols
+        self.cost = array('i', bytes(4 * rows * cols))
+        self.stamped = {}  # killer -> cell its danger is currently stamped around
+
+    def stamp(self, cell, sign):
+        """Add (sign 1) or remove (sign -1) one killer's danger diamond around cell"""
+        cx, cy = cell
+        for x in range(max(0, cx - DANGER_RADIUS), min(self.rows, cx + DANGER_RADIUS + 1)):
+            reach = DANGER_RADIUS - abs(x - cx)
+            for y in range(max(0, cy - reach), min(self.cols, cy + reach + 1)):
+                self.cost[x * self.cols + y] += sign * DANGER_COST * (reach - abs(y - cy) + 1)
+
+    def sync(self, killers):
+        """Follow the killers' current cells, touching only those that moved, appeared or left"""
+        present = set()
+        for killer in killers:
+            present.add(killer)
+            cell = tuple(killer.position)
+            old = self.stamped.get(killer)
+            if old != cell:
+                if old is not None:
+                    self.stamp(old, -1)
+                self.stamp(cell, 1)
+                self.stamped[killer] = cell
+
+        for killer in [k for k in self.stamped if k not in present]:
+            self.stamp(self.stamped.pop(killer), -1)
+
+class ClusterPlanner:
+    """Hierarchical (HPA*) planner: searches cluster entrances first, then refines only the clusters on the route"""
+    def __init__(self, maze, cluster_size=CLUSTER_SIZE):
+        self.cluster_size = cluster_size
+        self.build(maze)
+
+    def build(self, maze):
+        self.rows, self.cols = len(maze), len(maze[0])
+        self.version = getattr(maze, 'version', 0)
+        self.cluster_rows = (self.rows + self.cluster_size - 1) // self.cluster_size
+        self.cluster_cols = (self.cols + self.cluster_size - 1) // self.cluster_size
+        self.borders = {}  # (cluster, neighbour cluster) -> [(cell, neighbour cell)] entrance pairs
+        self.links = {}    # entrance cell -> entrance cells across a border
+        self.intra = {}    # cluster -> {entrance: {entrance: distance inside the cluster}}
+
+        for cr in range(self.cluster_rows):
+            for cc in range(self.cluster_cols):
+                if cr + 1 < self.cluster_rows:
+                    self.update_border(maze, ((cr, cc), (cr + 1, cc)))
+                if cc + 1 < self.cluster_cols:
+                    self.update_border(maze, ((cr, cc), (cr, cc + 1)))
+
+        for cr in range(self.cluster_rows):
+            for cc in range(self.cluster_cols):
+                self.update_cluster(maze, (cr, cc))
+
+    def cluster_of(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    def bounds(self, cluster):
+        cr, cc = cluster
+        return (cr * self.cluster_size, min(self.rows, (cr + 1) * self.cluster_size),
+                cc * self.cluster_size, min(self.cols, (cc + 1) * self.cluster_size))
+
+    def cluster_borders(self, cluster):
+        cr, cc = cluster
+        keys = [((cr - 1, cc), cluster), (cluster, (cr + 1, cc)),
+                ((cr, cc - 1), cluster), (cluster, (cr, cc + 1))]
+        return [key for key in keys if key in self.borders]
+
+    def update_border(self, maze, key):
+        """Recompute the entrances between two neighbouring clusters"""
+        for a, b in self.borders.get(key, []):
+            self.links[a].discard(b)
+            self.links[b].discard(a)
+
+        (cr, cc), (nr, nc) = key
+        top, bottom, left, right = self.bounds((cr, cc))
+        if nr != cr:
+            pairs = [((bottom - 1, y), (bottom, y)) for y in range(left, right)]
+        else:
+            pairs = [((x, right - 1), (x, right)) for x in range(top, bottom)]
+
+        # Each run of open cell pairs becomes one entrance, long runs get one at each end
+        entrances = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and maze[pair[0][0]][pair[0][1]] != '#' and maze[pair[1][0]][pair[1][1]] != '#':
+                run.append(pair)
+                continue
+            if run:
+                if len(run) > 6:
+                    entrances.extend([run[0], run[-1]])
+                else:
+                    entrances.append(run[len(run) // 2])
+            run = []
+
+        self.borders[key] = entrances
+        for a, b in entrances:
+            self.links.setdefault(a, set()).add(b)
+            self.links.setdefault(b, set()).add(a)
+
+    def update_cluster(self, maze, cluster):
+        """Recompute entrance-to-entrance distances inside one cluster"""
+        entrances = set()
+        for key in self.cluster_borders(cluster):
+            for a, b in self.borders[key]:
+                entrances.add(a if self.cluster_of(a) == cluster else b)
+
+        edges = {}
+        for entrance in entrances:
+            dist = self.local_search(maze, cluster, entrance)[0]
+            edges[entrance] = {other: dist[other] for other in entrances
+                               if other != entrance and other in dist}
+        self.intra[cluster] = edges
+
+    def local_search(self, maze, cluster, source):
+        """BFS from source that never leaves its cluster, returning distances and parents"""
+        top, bottom, left, right = self.bounds(cluster)
+        dist = {source: 0}
+        parent = {source: None}
+        queue = deque([source])
+
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                nx, ny = x + dx, y + dy
+                if (top <= nx < bottom and left <= ny < right and
+                    maze[nx][ny] != '#' and (nx, ny) not in dist):
+                    dist[(nx, ny)] = dist[(x, y)] + 1
+                    parent[(nx, ny)] = (x, y)
+                    queue.append((nx, ny))
+
+        return dist, parent
+
+    def local_path(self, maze, source, target):
+        parent = self.local_search(maze, self.cluster_of(source), source)[1]
+        if target not in parent:
+            return None
+        path = []
+        cell = target
+        while cell is not None:
+            path.append(cell)
+            cell = parent[cell]
+        path.reverse()
+        return path
+
+    def sync(self, maze):
+        """Recompute only the borders and clusters touched since the last sync"""
+        if (len(maze), len(maze[0])) != (self.rows, self.cols):
+            self.build(maze)
+            return
+
+        changed = maze.changes_since(self.version)
+        if changed is None:
+            self.build(maze)
+            return
+
+        dirty_borders = set()
+        dirty_clusters = set()
+        for cell in changed:
+            cluster = self.cluster_of(cell)
+            dirty_clusters.add(cluster)
+            top, bottom, left, right = self.bounds(cluster)
+            on_edge = [cell[0] == top, cell[0] == bottom - 1, cell[1] == left, cell[1] == right - 1]
+            cr, cc = cluster
+            for hit, key in zip(on_edge, [((cr - 1, cc), cluster), (cluster, (cr + 1, cc)),
+                                          ((cr, cc - 1), cluster), (cluster, (cr, cc + 1))]):
+                if hit and key in self.borders:
+                    dirty_borders.add(key)
+                    dirty_clusters.update(key)
+
+        for key in dirty_borders:
+            self.update_border(maze, key)
+        for cluster in dirty_clusters:
+            self.update_cluster(maze, cluster)
+        self.version = maze.version
+
+    def find_path(self, maze, start, end):
+        """Near-optimal cell path from start to end, or None when there is none"""
+        start, end = tuple(start), tuple(end)
+        if maze[start[0]][start[1]] == '#' or maze[end[0]][end[1]] == '#':
+            return None
+        if start == end:
+            return [start]
+
+        start_cluster, end_cluster = self.cluster_of(start), self.cluster_of(end)
+        if start_cluster == end_cluster:
+            path = self.local_path(maze, start, end)
+            if path:
+                return path
+
+        # Temporary edges from start and to end through their own clusters
+        start_dist = self.local_search(maze, start_cluster, start)[0]
+        end_dist = self.local_search(maze, end_cluster, end)[0]
+        start_edges = {node: start_dist[node] for node in self.intra[start_cluster] if node in start_dist}
+        end_edges = {node: end_dist[node] for node in self.intra[end_cluster] if node in end_dist}
+
+        g = {start: 0}
+        parent = {start: None}
+        open_set = [(manhattan_distance(start, end), 0, start)]
+        while open_set:
+            f, cost, node = heapq.heappop(open_set)
+            if node == end:
+                break
+            if cost > g[node]:
+                continue
+
+            if node == start:
+                neighbors = list(start_edges.items())
+            else:
+                neighbors = list(self.intra[self.cluster_of(node)].get(node, {}).items())
+                if node in end_edges:
+                    neighbors.append((end, end_edges[node]))
+            neighbors += [(other, 1) for other in self.links.get(node, ())]
+
+            for other, step in neighbors:
+                new_cost = cost + step
+                if new_cost < g.get(other, float('inf')):
+                    g[other] = new_cost
+                    parent[other] = node
+                    heapq.heappush(open_set, (new_cost + manhattan_distance(other, end), new_cost, other))
+
+        if end not in parent:
+            return None
+
+        # Refine each abstract hop into cells, searching only the clusters it crosses
+        abstract = []
+        node = end
+        while node is not None:
+            abstract.append(node)
+            node = parent[node]
+        abstract.reverse()
+
+        path = [start]
+        for a, b in zip(abstract, abstract[1:]):
+            if self.cluster_of(a) != self.cluster_of(b):
+                path.append(b)  # Step across a border entrance
+            else:
+                path.extend(self.local_path(maze, a, b)[1:])
+        return path
+
+def get_cluster_planner(maze):
+    """Return the hierarchical planner for maze, recomputing only clusters touched since last use"""
+    if not isinstance(maze, MazeGrid):
+        # Without a change journal the planner would be rebuilt on every call; wrap a plain list
+        # in MazeGrid once and plan on that
+        raise TypeError("hierarchical planning needs a MazeGrid")
+
+    planner = maze.caches.get('clusters')
+    if planner is None:
+        planner = ClusterPlanner(maze)
+        maze.caches['clusters'] = planner
+    else:
+        planner.sync(maze)
+    return planner
+
+def plans_shortest(maze):
+    """Whether plan_path finds shortest paths on maze, rather than going through clusters"""
+    return len(maze) * len(maze[0]) < HIERARCHICAL_MIN_CELLS
+
+def plan_path(maze, start, end, rebuild=None):
+    """Path for agents and hints, using the hierarchical planner on very large mazes (which must be MazeGrids);
+    rebuild is an executor for landmark fields (see get_landmark_table)"""
+    if not plans_shortest(maze):
+        return get_cluster_planner(maze).find_path(maze, start, end)
+    return astar(maze, start, end, landmarks=get_landmark_table(maze, rebuild),
+                 graph=get_junction_graph(maze))
+
+def search_deadline(maze):
+    """perf_counter deadline for an anytime search where plans can't be exact, or None to search to the end"""
+    if plans_shortest(maze):
+        return None
+    return time.perf_counter() + ANYTIME_BUDGET_MS / 1000
+
+class PathPlanner:
+    """Runs plan_path (or weighted_astar around killers) on a worker thread against a replica of the maze,
+    so slow searches never block a frame"""
+    def __init__(self, threaded=True):
+        # Unthreaded planners search on the spot, for runs that have to repeat exactly
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='path-planner') if threaded else None
+        self.jobs = {}  # (maze version, start, goal, danger cells) -> Future
+        self.source = None  # Maze the replica mirrors
+        self.sent_version = None
+        self.replica = None  # Only touched by the worker thread
+
+    def request(self, maze, start, goal, danger=None, budget_ms=None):
+        """Future path from start to goal on maze as it is now, shared by identical requests;
+        with a DangerField, the cheapest path around the killers as they stand, and with budget_ms,
+        the best path an anytime search finds in that long once the job starts"""
+        if maze is not self.source:
+            # Jobs belong to the maze in play; a new one may even reuse the old one's id
+            self.jobs = {}
+        key = (getattr(maze, 'version', None), tuple(start), tuple(goal),
+               tuple(danger.stamped.values()) if danger else None, budget_ms is not None)
+        future = self.jobs.get(key)
+        if future is None:
+            if len(self.jobs) > 64:
+                self.jobs = {k: f for k, f in self.jobs.items() if not f.done()}
+            # The field keeps changing as killers move, so the worker gets a copy
+            cost = array('i', danger.cost) if danger else None
+            if self.executor is None:
+                future = Future()
+                future.set_result(self.search(self.replica_update(maze), tuple(start), tuple(goal), cost, budget_ms))
+            else:
+                future = self.executor.submit(self.search, self.replica_update(maze), tuple(start), tuple(goal),
+                                              cost, budget_ms)
+            self.jobs[key] = future
+        return future
+
+    def replica_update(self, maze):
+        """Wall changes the replica needs to match maze, or a full copy when the journal can't tell"""
+        changes = None
+        if maze is self.source and isinstance(maze, MazeGrid):
+            changes = maze.changes_since(self.sent_version)
+        self.source = maze
+        self.sent_version = getattr(maze, 'version', None)
+
+        if changes is None:
+            if isinstance(maze, MazeGrid):
+                return maze.snapshot(), None
+            return MazeGrid(list(row) for row in maze), None
+        return None, [(x, y, maze[x][y]) for x, y in set(changes)]
+
+    def search(self, update, start, goal, cost=None, budget_ms=None):
+        # Worker thread: jobs run in submission order, so updates apply in sequence
+        replica, cells = update
+        if replica is not None:
+            self.replica = replica
+        else:
+            for x, y, value in cells:
+                self.replica.set_cell(x, y, value)
+        # Landmark fields a wall change spoiled are rebuilt as a later job, not ahead of this search
+        if budget_ms is not None:
+            return anytime_astar(self.replica, start, goal, time.perf_counter() + budget_ms / 1000,
+                                 landmarks=get_landmark_table(self.replica, self.executor), cost=cost)
+        if cost is not None:
+            return weighted_astar(self.replica, start, goal, cost,
+                                  landmarks=get_landmark_table(self.replica, self.executor))
+        return plan_path(self.replica, start, goal, self.executor)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+def path_from(path, position):
+    """The rest of path from position onwards, or None when position is not on it"""
+    position = tuple(position)
+    if path:
+        for i, cell in enumerate(path):
+            if tuple(cell) == position:
+                return path[i:]
+    return None
+
+class PlannedRoute:
+    """An agent's current path, replaced whenever its background plan arrives"""
+    def __init__(self, planner):
+        self.planner = planner
+        self.path = None
+        self.future = None
+
+    def update(self, maze, position, goal, danger=None, budget_ms=None):
+        """Best path known from position to goal, starting a new plan once the last one has arrived"""
+        fresh = None
+        if self.future is None:
+            self.future = self.planner.request(maze, position, goal, danger, budget_ms)
+        if self.future.done():
+            fresh = path_from(self.future.result(), position)
+            self.future = None
+
+        # Keep following the previous path until a usable plan comes back
+        if fresh is not None:
+            self.path = fresh
+        else:
+            self.path = path_from(self.path, position)
+        return self.path
+
 def modify_maze_dynamically(maze, player_pos, difficulty_factor=0.05):
+    MazeModificationJob(maze, player_pos, difficulty_factor).run()
+    return maze
+
+class MazeModificationJob:
+    """modify_maze_dynamically split into small steps that run within a per-frame time budget"""
+    def __init__(self, maze, player_pos, difficulty_factor=0.05):
+        self.maze = maze
+        self.player_pos = player_pos  # Read live, the player keeps moving while the job runs
+        self.difficulty_factor = difficulty_factor
+        self.changes = {}  # Pending cell values, applied together once validated
+        self.done = False
+        self.steps = self.plan()
+
+    def run(self, budget_ms=None):
+        """Advance the job for at most budget_ms (or to completion), returning True once it has committed"""
+        if self.done:
+            return True
+
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+        for _ in self.steps:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+
+        self.done = True
+        return True
+
+    def cell(self, x, y):
+        value = self.changes.get((x, y))
+        return self.maze[x][y] if value is None else value
+
+    def reaches_exit(self, chunk=256):
+        """BFS from the exit over the maze with pending changes, yielding every chunk cells"""
+        rows, cols = len(self.maze), len(self.maze[0])
+        end = (rows - 2, cols - 1)
+        visited = {end}
+        queue = deque([end])
+        expanded = 0
+        player = tuple(self.player_pos)
+
+        while queue:
+            cell = queue.popleft()
+            if cell == player:
+                return True
+            x, y = cell
+
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < rows and 0 <= ny < cols and (nx, ny) not in visited and self.cell(nx, ny) != '#':
+                    visited.add((nx, ny))
+                    queue.append((nx, ny))
+
+            expanded += 1
+            if expanded % chunk == 0:
+                yield
+                # The player may have moved while other frames ran; cells already searched still count
+                player = tuple(self.player_pos)
+                if player in visited:
+                    return True
+
+        return False
+
+    def plan(self):
+        maze = self.maze
+        rows, cols = len(maze), len(maze[0])
+        end = (rows - 2, cols - 1)
+        
+        # Check if there's a valid path from player to exit
+        if not (yield from self.reaches_exit()):
+            create_escape_path(maze, tuple(self.player_pos), end)
+            return
+        
+        # Calculate how many walls to potentially add/remove
+        change_count = int(rows * cols * self.difficulty_factor * 0.01)
+        
+        # Try to add walls (increase difficulty)
+        for _ in range(change_count):
+            for _ in range(10):
+                x = rng.maze.randrange(1, rows - 1)
+                y = rng.maze.randrange(1, cols - 1)
+                
+                if self.cell(x, y) == ' ' and (x, y) != tuple(self.player_pos) and (x, y) not in [(1, 0), end]:
+                    self.changes[(x, y)] = '#'
+                    
+                    if (yield from self.reaches_exit()):
+                        break
+                    else:
+                        del self.changes[(x, y)]
+        
+        # Try to remove walls (possibly create shortcuts)
+        for _ in range(change_count):
+            x = rng.maze.randrange(1, rows - 1)
+            y = rng.maze.randrange(1, cols - 1)
+            
+            if self.cell(x, y) == '#':
+                adjacent_paths = 0
+                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                    nx, ny = x + dx, y + dy
+                    if is_valid(nx, ny, rows, cols) and self.cell(nx, ny) == ' ':
+                        adjacent_paths += 1
+                
+                if adjacent_paths >= 2:
+                    if rng.maze.random() < 0.3:
+                        self.changes[(x, y)] = ' '
+        
+        # Other mutations may land between slices, so revalidate until a check
+        # completes against an unchanged maze, then commit in the same slice
+        while True:
+            version = getattr(maze, 'version', None)
+            connected = yield from self.reaches_exit()
+            if version == getattr(maze, 'version', None):
+                break
+        
+        if connected:
+            # Cells an obstacle or item moved onto since are left alone
+            for (x, y), value in self.changes.items():
+                if maze[x][y] == ('#' if value == ' ' else ' '):
+                    set_cell(maze, x, y, value)
+
+def create_escape_path(maze, start, end):
+    """Open the route from start to end that breaks the fewest walls, shortest among those"""
+    rows, cols = len(maze), len(maze[0])
+    
+    # 0-1 BFS: open cells cost nothing, breaking an interior wall costs one
+    walls = array('i', [-1]) * (rows * cols)  # Walls broken to reach each cell
+    steps = array('i', [-1]) * (rows * cols)
+    parent = array('i', [-1]) * (rows * cols)
+    source, goal = start[0] * cols + start[1], end[0] * cols + end[1]
+    walls[source], steps[source] = 0, 0
+    
+    layer = [source]
+    broken = 0
+    while layer and walls[goal] < 0:
+        # Expand one wall count at a time, breadth first, so ties go to the shorter route
+        seeds = deque(sorted(layer, key=steps.__getitem__))
+        queue = deque()
+        next_layer = []
+        
+        while (seeds or queue) and walls[goal] < 0:
+            if seeds and (not queue or steps[seeds[0]] <= steps[queue[0]]):
+                i = seeds.popleft()
+            else:
+                i = queue.popleft()
+            x, y = divmod(i, cols)
+            
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < rows and 0 <= ny < cols):
+                    continue
+                j = nx * cols + ny
+                if walls[j] >= 0:
+                    continue
+                
+                if maze[nx][ny] != '#':
+                    walls[j], steps[j], parent[j] = broken, steps[i] + 1, i
+                    queue.append(j)
+                elif 0 < nx < rows - 1 and 0 < ny < cols - 1:
+                    walls[j], steps[j], parent[j] = broken + 1, steps[i] + 1, i
+                    next_layer.append(j)
+        
+        layer = next_layer
+        broken += 1
+    
+    if walls[goal] >= 0:
+        i = goal
+        while i >= 0:
+            x, y = divmod(i, cols)
+            if maze[x][y] == '#':
+                set_cell(maze, x, y, ' ')
+            i = parent[i]
+    
+    return maze
+
+def share_grid(shared, maze, field=None):
+    """Write maze into a shared memory block at one byte per cell, followed by field's ints if given,
+    replacing the block if it is too small"""
     rows, cols = len(maze), len(maze[0])
-    start = tuple(player_pos)
+    size = rows * cols * (1 + (field.itemsize if field is not None else 0))
+    if shared is None or shared.size < size:
+        release_shared(shared)
+        shared = shared_memory.SharedMemory(create=True, size=size)
+    for x, row in enumerate(maze):
+        shared.buf[x * cols:(x + 1) * cols] = ''.join(row).encode('latin-1')
+    if field is not None:
+        shared.buf[rows * cols:size] = field.tobytes()
+    return shared
+
+def worker_context():
+    """Start method for worker processes: never fork, since the path planner thread may hold a lock by then"""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+def release_shared(shared):
+    if shared is not None:
+        shared.close()
+        shared.unlink()
+
+def read_shared_grid(shared_name, rows, cols):
+    """Worker process: copy of a grid written by share_grid"""
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        data = bytes(shared.buf[:rows * cols])
+    finally:
+        shared.close()
+    return MazeGrid(list(data[x * cols:(x + 1) * cols].decode('latin-1')) for x in range(rows))
+
+def read_shared_field(shared_name, rows, cols):
+    """Worker process: copy of the field share_grid wrote after the grid"""
+    field = array('i')
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        field.frombytes(bytes(shared.buf[rows * cols:rows * cols * (1 + field.itemsize)]))
+    finally:
+        shared.close()
+    return field
+
+def _run_maze_mutation(shared_name, rows, cols, kind, args, seed):
+    """Worker process: mutate a back buffer copied from the shared front buffer and return the diff"""
+    front = read_shared_grid(shared_name, rows, cols)
+    back = front.snapshot()
+    rng.maze.seed(seed)
+    
     end = (rows - 2, cols - 1)
+    if kind == 'modify':
+        player_pos, difficulty_factor = args
+        modify_maze_dynamically(back, list(player_pos), difficulty_factor)
+    elif kind == 'repair':
+        for position in args:
+            if not bfs(back, position, end):
+                create_escape_path(back, position, end)
+    
+    # Only rows the mutation copied can differ from the front buffer
+    diff = []
+    for x in sorted(back.owned):
+        row, old = back[x], front[x]
+        for y in range(cols):
+            if row[y] != old[y]:
+                diff.append((x, y, old[y], row[y]))
+    return diff
+
+class MazeMutationWorker:
+    """Runs maze mutations on a back buffer in a worker process and swaps the diff in at a frame boundary"""
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=worker_context())
+        self.shared = None  # Front buffer for the worker, one byte per cell
+        self.queue = []  # (maze, kind, args) waiting for the worker
+        self.running = None  # (future, (maze, kind, args)) of the job the worker is on
+        self.broken = False  # Set once the process pool fails; the caller takes over
+        self.orphans = []  # Jobs the worker could not finish, for the caller to run in-process
     
-    # Check if there's a valid path from player to exit
-    current_path = bfs(maze, start, end)
-    if not current_path:
-        create_escape_path(maze, start, end)
-        return maze
+    def request_modify(self, maze, player_pos, difficulty_factor):
+        if self.broken:
+            self.orphans.append((maze, 'modify', (tuple(player_pos), difficulty_factor)))
+            return
+        self.queue.append((maze, 'modify', (tuple(player_pos), difficulty_factor)))
+        self.start_next()
+    
+    def request_repair(self, maze, positions):
+        """Open escape paths for any of positions cut off from the exit"""
+        positions = tuple(tuple(position) for position in positions)
+        if self.broken:
+            self.orphans.append((maze, 'repair', positions))
+            return
+        for i, (queued_maze, kind, args) in enumerate(self.queue):
+            if queued_maze is maze and kind == 'repair':
+                self.queue[i] = (maze, kind, args + tuple(p for p in positions if p not in args))
+                return
+        self.queue.append((maze, 'repair', positions))
+        self.start_next()
+    
+    def start_next(self):
+        # One job at a time, so the front buffer is never rewritten while the worker reads it
+        if self.running is not None or not self.queue or self.broken:
+            return
+        
+        maze, kind, args = self.queue.pop(0)
+        rows, cols = len(maze), len(maze[0])
+        self.shared = share_grid(self.shared, maze)
+        
+        try:
+            future = self.executor.submit(_run_maze_mutation, self.shared.name, rows, cols,
+                                          kind, args, rng.maze.getrandbits(32))
+        except (RuntimeError, OSError):
+            # A pool that could not start its process only says so on submit
+            self.fail((maze, kind, args))
+            return
+        self.running = (future, (maze, kind, args))
     
-    # Calculate how many walls to potentially add/remove
-    change_count = int(rows * cols * difficulty_factor * 0.01)
+    def fail(self, job):
+        """Stop using the process pool and hand job and everything queued back to the caller"""
+        self.broken = True
+        self.orphans = [job] + self.queue
+        self.queue = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
     
-    # Try to add walls (increase difficulty)
-    for _ in range(change_count):
-        for _ in range(10):
-            x = random.randrange(1, rows - 1)
-            y = random.randrange(1, cols - 1)
+    def swap_in(self, maze, positions):
+        """Apply a finished mutation to maze, returning the cells it changed"""
+        if self.running is None or not self.running[0].done():
+            return []
+        
+        future, job = self.running
+        self.running = None
+        changed = []
+        
+        try:
+            diff = future.result()
+        except Exception:
+            # Broken pool or a failure inside the worker: the caller redoes the job in-process
+            self.fail(job)
+            return changed
+        
+        if job[0] is maze:
+            # Cells that changed since the snapshot keep their newer value, and nobody gets walled in
+            occupied = {tuple(position) for position in positions}
+            walled = False
+            for x, y, old, new in diff:
+                if maze[x][y] == old and (x, y) not in occupied:
+                    set_cell(maze, x, y, new)
+                    changed.append((x, y))
+                    walled = walled or new == '#'
             
-            if maze[x][y] == ' ' and (x, y) != start and (x, y) != end and (x, y) not in [(1,0), (rows-2, cols-1)]:
-                maze[x][y] = '#'
-                
-                if bfs(maze, start, end):
-                    break
-                else:
-                    maze[x][y] = ' '
+            # The worker checked connectivity from where everyone was when it started
+            if walled:
+                end = (len(maze) - 2, len(maze[0]) - 1)
+                for position in occupied:
+                    if not bfs(maze, position, end):
+                        create_escape_path(maze, position, end)
+        
+        self.start_next()
+        return changed
     
-    # Try to remove walls (possibly create shortcuts)
-    for _ in range(change_count):
-        x = random.randrange(1, rows - 1)
-        y = random.randrange(1, cols - 1)
-        
-        if maze[x][y] == '#':
-            adjacent_paths = 0
-            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                nx, ny = x + dx, y + dy
-                if is_valid(nx, ny, rows, cols) and maze[nx][ny] == ' ':
-                    adjacent_paths += 1
-            
-            if adjacent_paths >= 2:
-                if random.random() < 0.3:
-                    maze[x][y] = ' '
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        release_shared(self.shared)
+        self.shared = None
+
+def get_exit_field(maze):
+    """Distances to the exit, rebuilt only when the walls change"""
+    cached = maze.caches.get('exit') if isinstance(maze, MazeGrid) else None
+    if cached and cached[0] == maze.version:
+        return cached[1]
+    field = distance_field(maze, [(len(maze) - 2, len(maze[0]) - 1)])
+    if isinstance(maze, MazeGrid):
+        maze.caches['exit'] = (maze.version, field)
+    return field
+
+def _lookahead_rollouts(maze, field, position, move_delay, now, obstacles, walls, sections, budget_ms,
+                        rollouts=None, seed=None):
+    """Run rollouts from each first step of the AI for budget_ms, or a fixed count; return (step, score total, count);
+    field holds the distances to the exit"""
+    deadline = time.perf_counter() + budget_ms / 1000
+    rand = random.Random(seed)
     
-    return maze
+    # Each rollout plays on its own copy-on-write snapshot, so the grid it was given is never touched
+    base = maze if isinstance(maze, MazeGrid) else MazeGrid(list(row) for row in maze)
+    rows, cols = len(base), len(base[0])
+    
+    x, y = position
+    steps = [(x + dx, y + dy) for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+             if is_valid(x + dx, y + dy, rows, cols) and base[x + dx][y + dy] != '#']
+    totals = {step: [0, 0] for step in steps}
+    
+    # Every step gets at least one rollout, then they take turns until the budget runs out
+    i = 0
+    while steps and (i < len(steps) or (time.perf_counter() < deadline if rollouts is None else i < rollouts)):
+        step = steps[i % len(steps)]
+        i += 1
+        totals[step][0] += _rollout(base, field, position, step, move_delay, now, obstacles, walls, sections, rand)
+        totals[step][1] += 1
+    return [(step, total, count) for step, (total, count) in totals.items()]
 
-def create_escape_path(maze, start, end):
+def _lookahead_worker(shared_name, rows, cols, *args):
+    """Worker process: _lookahead_rollouts on the grid and exit distances best_move shared"""
+    return _lookahead_rollouts(read_shared_grid(shared_name, rows, cols), read_shared_field(shared_name, rows, cols),
+                               *args)
+
+def _rollout(base, field, position, step, move_delay, now, obstacles, walls, sections, rand):
+    """Play LOOKAHEAD_HORIZON_MS ahead on a snapshot of base after the AI takes step; higher is better,
+    with every cell entered near a killer costing what DangerField charges for it"""
+    maze = base.snapshot()
     rows, cols = len(maze), len(maze[0])
+    end = (rows - 2, cols - 1)
+    walls = [wall.clone(maze) for wall in walls]
+    sections = [section.clone(maze) for section in sections]
+    obstacles = [list(obstacle) for obstacle in obstacles]  # [x, y, wake time, delay, is killer]
+    occupied = {(ox, oy) for ox, oy, wake, delay, killer in obstacles}
     
-    path = astar(maze, start, end, ignore_walls=True)
+    ai = step if step not in occupied else tuple(position)
+    danger = _rollout_danger(ai, obstacles)
+    max_moves = LOOKAHEAD_HORIZON_MS // move_delay
+    moves = 1
+    t = now
+    while moves <= max_moves:
+        if ai == end:
+            return max_moves - moves - danger
+        t += move_delay
+        
+        # Obstacles wander, walls shift and sections rotate when their timers come due
+        for obstacle in obstacles:
+            if obstacle[2] <= t:
+                obstacle[2] = t + obstacle[3]
+                ox, oy = obstacle[0], obstacle[1]
+                dx, dy = rand.choice([(-1, 0), (1, 0), (0, -1), (0, 1)])
+                if is_valid(ox + dx, oy + dy, rows, cols) and maze[ox + dx][oy + dy] != '#':
+                    obstacle[0], obstacle[1] = ox + dx, oy + dy
+        occupied = {(ox, oy) for ox, oy, wake, delay, killer in obstacles}
+        for wall in walls:
+            if wall.next_update_time() <= t:
+                wall.shift_timer = t
+                wall.shift(rand)
+        for section in sections:
+            if section.next_update_time() <= t:
+                section.rotation_timer = t
+                section.rotate_section()
+                if ai in section.cell_set:
+                    cx, cy = section.center
+                    ai = (cx + ai[1] - cy, cy - ai[0] + cx)
+        
+        # The AI heads for the exit, with occasional detours so rollouts differ
+        x, y = ai
+        options = [(x + dx, y + dy) for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                   if is_valid(x + dx, y + dy, rows, cols) and maze[x + dx][y + dy] != '#'
+                   and (x + dx, y + dy) not in occupied]
+        if options:
+            if rand.random() < LOOKAHEAD_EXPLORE:
+                ai = rand.choice(options)
+            else:
+                # Unreachable cells (-1) wrap round to sort last
+                ai = min(options, key=lambda cell: field[cell[0] * cols + cell[1]] % (rows * cols + 1))
+        danger += _rollout_danger(ai, obstacles)
+        moves += 1
     
-    if path:
-        for x, y in path:
-            if maze[x][y] == '#':
-                maze[x][y] = ' '
+    distance = field[ai[0] * cols + ai[1]]
+    return -(distance if distance >= 0 else rows * cols) - danger
+
+def _rollout_danger(cell, obstacles):
+    """DangerField's extra cost for standing on cell, from the killers where the rollout has moved them"""
+    danger = 0
+    for ox, oy, wake, delay, killer in obstacles:
+        if killer:
+            closeness = DANGER_RADIUS - abs(cell[0] - ox) - abs(cell[1] - oy)
+            if closeness >= 0:
+                danger += DANGER_COST * (closeness + 1)
+    return danger
+
+class MonteCarloLookahead:
+    """Picks the AI's next step by simulated rollouts, spread over worker processes when cores allow"""
+    def __init__(self, budget_ms=LOOKAHEAD_BUDGET_MS, rollouts=None):
+        self.budget_ms = budget_ms
+        self.rollouts = rollouts  # Fixed rollouts per move instead of a time budget, for repeatable runs
+        self.workers = min(LOOKAHEAD_WORKERS, (os.cpu_count() or 1) - 1) if rollouts is None else 0
+        self.executor = None
+        self.shared = None  # The grid for worker processes, one byte per cell
+        self.shared_for = None  # (maze, version) the shared grid holds
+        if self.workers > 0:
+            try:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+            except (ImportError, NotImplementedError, OSError):
+                self.executor = None
     
-    return maze
+    def best_move(self, maze, position, move_delay, now, obstacles, killer_obstacles, walls, sections):
+        """Neighbouring cell with the best average rollout score, or None when boxed in"""
+        obstacles = [(o.position[0], o.position[1], o.next_update_time(), o.move_delay, killer)
+                     for killer, group in enumerate((obstacles, killer_obstacles)) for o in group]
+        walls = [wall.clone(None) for wall in walls]
+        sections = [section.clone(None) for section in sections]
+        
+        # Distances to the exit are worked out once per wall layout, outside the rollout budget
+        field = get_exit_field(maze)
+        if self.executor is not None:
+            # Workers read the grid and distances from shared memory, rewritten only when the walls have changed
+            rows, cols = len(maze), len(maze[0])
+            version = getattr(maze, 'version', None)
+            other_maze = self.shared_for is None or self.shared_for[0] is not maze
+            if other_maze or version is None or self.shared_for[1] != version:
+                self.shared = share_grid(self.shared, maze, field)
+                self.shared_for = (maze, version)
+        
+        # Everything, workers included, finishes within the one budget
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        budget_ms = self.budget_ms - LOOKAHEAD_SLACK_MS if self.executor is not None else self.budget_ms
+        args = (tuple(position), move_delay, now, obstacles, walls, sections, budget_ms, self.rollouts)
+        
+        futures = []
+        if self.executor is not None:
+            futures = [self.executor.submit(_lookahead_worker, self.shared.name, rows, cols, *args,
+                                            rng.ai.getrandbits(32))
+                       for _ in range(self.workers)]
+        
+        # The main thread runs its own share while the workers run theirs
+        results = _lookahead_rollouts(maze, field, *args, rng.ai.getrandbits(32))
+        if futures:
+            done, late = wait(futures, timeout=max(0, deadline - time.perf_counter()))
+            for future in late:
+                future.cancel()
+            for future in done:
+                if future.exception() is None:
+                    results.extend(future.result())
+        
+        scores = {}
+        for step, total, count in results:
+            score = scores.setdefault(step, [0, 0])
+            score[0] += total
+            score[1] += count
+        if not scores:
+            return None
+        return max(scores, key=lambda step: scores[step][0] / scores[step][1])
+    
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        release_shared(self.shared)
+        self.shared = None
 
 class AICompetitor:
-    def __init__(self, maze, start_pos):
+    def __init__(self, maze, start_pos, planner=None):
         self.maze = maze
         self.position = list(start_pos)
         self.path = None
+        self.route = PlannedRoute(planner) if planner else None
         self.move_timer = 0
         self.move_delay = 200  # Base movement speed
         self.has_speed_boost = False
@@ -209,8 +1791,12 @@ class AICompetitor:
         self.trapped_count = 0
         self.intelligence = 0.3  # Intelligence factor (0.0 to 1.0)
         # Higher intelligence means better at finding optimal paths
+        self.lookahead = None  # MonteCarloLookahead for smart moves on harder levels
+        self.shifting_walls = []  # Moving parts of the maze that rollouts simulate
+        self.rotating_sections = []
+        self.danger = None  # DangerField around killer obstacles, built on the first move that needs it
         
-    def update(self, current_time, player_pos, obstacles, killer_obstacles):
+    def update(self, current_time, player_pos, obstacles, killer_obstacles, deadline=None):
         if current_time is None or not isinstance(current_time, (int, float)):
             return
     
@@ -225,7 +1811,7 @@ class AICompetitor:
         
         if current_time - self.move_timer >= self.get_move_delay():
             self.move_timer = current_time
-            self.move(player_pos, obstacles, killer_obstacles)
+            self.move(player_pos, obstacles, killer_obstacles, deadline)
     
     
     def scale_with_level(self, level):
@@ -238,108 +1824,158 @@ class AICompetitor:
     def get_move_delay(self):
         return self.move_delay / 1.5 if self.has_speed_boost else self.move_delay
     
-    def move(self, player_pos, obstacles, killer_obstacles):
+    def move(self, player_pos, obstacles, killer_obstacles, deadline=None):
         # AI pathfinding logic with different strategies based on current situation
         end = (len(self.maze) - 2, len(self.maze[0]) - 1)
         
+        # Cells holding an obstacle, gathered once for every check below
+        blocked = {tuple(obs.position) for obs in obstacles}
+        blocked.update(tuple(obs.position) for obs in killer_obstacles)
+        
         # Calculate path to exit if needed
-        if random.random() < self.intelligence:
+        if rng.ai.random() < self.intelligence:
+            # Every kind of smart move below keeps clear of killers, so their danger is brought up to date first
+            danger = None
+            if killer_obstacles and not self.lookahead:
+                if self.danger is None or (self.danger.rows, self.danger.cols) != (len(self.maze), len(self.maze[0])):
+                    self.danger = DangerField(len(self.maze), len(self.maze[0]))
+                self.danger.sync(killer_obstacles)
+                danger = self.danger
+            
+            if self.lookahead:
+                # Smart move: take the step whose simulated futures go best, killers' danger included
+                step = self.lookahead.best_move(self.maze, self.position, self.get_move_delay(), self.move_timer,
+                                                obstacles, killer_obstacles, self.shifting_walls,
+                                                self.rotating_sections)
+                self.path = [tuple(self.position), step] if step else None
+            elif deadline is not None:
+                # Smart move within a time limit: best path (around any killers) the anytime search finds
+                # in the time left, on the planner's thread when there is one
+                if self.route:
+                    budget_ms = max(0.0, (deadline - time.perf_counter()) * 1000)
+                    self.path = self.route.update(self.maze, self.position, end, danger, budget_ms)
+                else:
+                    self.path = anytime_astar(self.maze, tuple(self.position), end, deadline,
+                                              landmarks=known_landmark_table(self.maze),
+                                              cost=danger.cost if danger else None)
+            elif danger:
+                # Smart move: one search for the shortest path that keeps clear of killers, off the frame if possible
+                if self.route:
+                    self.path = self.route.update(self.maze, self.position, end, danger)
+                else:
+                    self.path = weighted_astar(self.maze, tuple(self.position), end, danger.cost,
+                                               landmarks=get_landmark_table(self.maze))
             # Smart move: Use A* to find path to exit
-            self.path = astar(self.maze, tuple(self.position), end)
+            elif self.route:
+                self.path = self.route.update(self.maze, self.position, end)
+            else:
+                self.path = plan_path(self.maze, tuple(self.position), end)
         else:
             # Sometimes make suboptimal moves to simulate human error
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            random.shuffle(directions)
             self.path = None
         
-        # If path exists, follow next step
-        if self.path and len(self.path) > 1:
+        # If path exists, follow next step (a background plan may predate a wall change)
+        if self.path and len(self.path) > 1 and self.maze[self.path[1][0]][self.path[1][1]] != '#':
             next_pos = self.path[1]
             
-            # Check if next position has an obstacle
-            obstacle_at_pos = False
-            for obs in obstacles + killer_obstacles:
-                if list(obs.position) == list(next_pos) and not self.is_invisible:
-                    obstacle_at_pos = True
-                    break
-            
-            if not obstacle_at_pos:
+            if self.is_invisible or tuple(next_pos) not in blocked:
                 self.position = list(next_pos)
             else:
                 # Try to find alternate path around obstacle
                 self.path = None
-                # Try each direction
                 for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
                     new_x, new_y = self.position[0] + dx, self.position[1] + dy
                     if (is_valid(new_x, new_y, len(self.maze), len(self.maze[0])) and 
-                        self.maze[new_x][new_y] != '#'):
-                        
-                        # Check if there's an obstacle
-                        has_obstacle = False
-                        for obs in obstacles + killer_obstacles:
-                            if list(obs.position) == [new_x, new_y]:
-                                has_obstacle = True
-                                break
-                        
-                        if not has_obstacle:
-                            self.position = [new_x, new_y]
-                            break
+                        self.maze[new_x][new_y] != '#' and (new_x, new_y) not in blocked):
+                        self.position = [new_x, new_y]
+                        break
         else:
             # No path or at end of path, try random valid move
             directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            random.shuffle(directions)
+            rng.ai.shuffle(directions)
             
             for dx, dy in directions:
                 new_x, new_y = self.position[0] + dx, self.position[1] + dy
                 if (is_valid(new_x, new_y, len(self.maze), len(self.maze[0])) and 
-                    self.maze[new_x][new_y] != '#'):
-                    
-                    # Check if there's an obstacle
-                    has_obstacle = False
-                    for obs in obstacles + killer_obstacles:
-                        if list(obs.position) == [new_x, new_y] and not self.is_invisible:
-                            has_obstacle = True
-                            break
-                    
-                    if not has_obstacle:
-                        self.position = [new_x, new_y]
-                        break
+                    self.maze[new_x][new_y] != '#' and
+                    (self.is_invisible or (new_x, new_y) not in blocked)):
+                    self.position = [new_x, new_y]
+                    break
+
+# Obstacle kinds, as stored in ObstacleStore.kinds
+REGULAR_OBSTACLE, KILLER_OBSTACLE = range(2)
+
+# Below this many obstacles a plain loop beats setting up NumPy arrays
+NUMPY_BATCH_MIN = 64
+
+class ObstacleStore:
+    """Positions and kinds of every obstacle in parallel arrays, for batched collision checks and drawing"""
+    def __init__(self):
+        self.xs = array('i')
+        self.ys = array('i')
+        self.kinds = array('b')
+        self.visible = True  # Cleared while the player is invisible
+    
+    def add(self, position, kind):
+        """Append an obstacle and return its slot"""
+        self.xs.append(position[0])
+        self.ys.append(position[1])
+        self.kinds.append(kind)
+        return len(self.kinds) - 1
+    
+    def move(self, slot, position):
+        self.xs[slot], self.ys[slot] = position
+    
+    def kinds_at(self, x, y):
+        """Set of obstacle kinds standing on (x, y)"""
+        if np is not None and len(self.kinds) >= NUMPY_BATCH_MIN:
+            hits = np.flatnonzero((np.frombuffer(self.xs, dtype=np.intc) == x) &
+                                  (np.frombuffer(self.ys, dtype=np.intc) == y))
+            return {self.kinds[i] for i in hits}
+        return {kind for ox, oy, kind in zip(self.xs, self.ys, self.kinds) if ox == x and oy == y}
+    
+    def cells(self):
+        """(x, y, kind) for every obstacle"""
+        return zip(self.xs, self.ys, self.kinds)
 
-                    
 class AIObstacle:
-    def __init__(self, maze, player_pos):
+    __slots__ = ('maze', 'position', 'original_cell', 'move_timer', 'move_delay', 'route', 'store', 'slot')
+    
+    def __init__(self, maze, player_pos, planner=None, store=None):
         self.maze = maze
-        self.rows, self.cols = len(maze), len(maze[0])
         self.position = self.find_valid_position(tuple(player_pos))
+        self.store = store  # Optional ObstacleStore mirroring this obstacle's position
+        self.slot = store.add(self.position, REGULAR_OBSTACLE) if store is not None else None
         self.original_cell = ' '
         self.move_timer = 0
         self.move_delay = 2000
-        self.visible = True  # For invisibility power-up
+        self.route = PlannedRoute(planner) if planner else None
         
     def find_valid_position(self, player_pos):
+        rows, cols = len(self.maze), len(self.maze[0])
         start = (1, 0)
-        end = (self.rows - 2, self.cols - 1)
+        end = (rows - 2, cols - 1)
         
         for _ in range(20):
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             
             if (self.maze[x][y] == ' ' and 
                 manhattan_distance((x, y), player_pos) > 5 and
                 (x, y) != start and (x, y) != end):
                 
                 original = self.maze[x][y]
-                self.maze[x][y] = 'O'
+                set_cell(self.maze, x, y, 'O')
                 
                 if bfs(self.maze, player_pos, end):
-                    self.maze[x][y] = original
+                    set_cell(self.maze, x, y, original)
                     return (x, y)
                 
-                self.maze[x][y] = original
+                set_cell(self.maze, x, y, original)
         
         while True:
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             if (self.maze[x][y] == ' ' and 
                 manhattan_distance((x, y), player_pos) > 3):
                 return (x, y)
@@ -351,23 +1987,30 @@ class AIObstacle:
             self.move_timer = current_time
             self.move(tuple(player_pos))
     
+    def next_update_time(self):
+        return self.move_timer + self.move_delay
+    
     def move(self, player_pos):
-        end = (self.rows - 2, self.cols - 1)
+        rows, cols = len(self.maze), len(self.maze[0])
+        end = (rows - 2, cols - 1)
         
         x, y = self.position
-        self.maze[x][y] = self.original_cell
+        set_cell(self.maze, x, y, self.original_cell)
         
-        if random.random() < 0.7:
-            path = astar(self.maze, self.position, player_pos)
-            if path and len(path) > 1:
+        if rng.obstacles.random() < 0.7:
+            if self.route:
+                path = self.route.update(self.maze, self.position, player_pos)
+            else:
+                path = plan_path(self.maze, self.position, player_pos)
+            if path and len(path) > 1 and self.maze[path[1][0]][path[1][1]] != '#':
                 next_pos = path[1]
             else:
                 directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                random.shuffle(directions)
+                rng.obstacles.shuffle(directions)
                 next_pos = self.position
                 for dx, dy in directions:
                     nx, ny = x + dx, y + dy
-                    if (is_valid(nx, ny, self.rows, self.cols) and 
+                    if (is_valid(nx, ny, rows, cols) and 
                         self.maze[nx][ny] == ' ' and
                         (nx, ny) != player_pos and 
                         (nx, ny) != end):
@@ -375,11 +2018,11 @@ class AIObstacle:
                         break
         else:
             directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            random.shuffle(directions)
+            rng.obstacles.shuffle(directions)
             next_pos = self.position
             for dx, dy in directions:
                 nx, ny = x + dx, y + dy
-                if (is_valid(nx, ny, self.rows, self.cols) and 
+                if (is_valid(nx, ny, rows, cols) and 
                     self.maze[nx][ny] == ' ' and
                     (nx, ny) != player_pos and 
                     (nx, ny) != end):
@@ -389,45 +2032,51 @@ class AIObstacle:
         new_x, new_y = next_pos
         self.original_cell = self.maze[new_x][new_y]
         
-        self.maze[new_x][new_y] = 'O'
+        set_cell(self.maze, new_x, new_y, 'O')
         self.position = next_pos
+        if self.store is not None:
+            self.store.move(self.slot, next_pos)
 
 # New class for killer obstacles
 class KillerObstacle:
-    def __init__(self, maze, player_pos):
+    __slots__ = ('maze', 'position', 'original_cell', 'move_timer', 'move_delay', 'route', 'store', 'slot')
+    
+    def __init__(self, maze, player_pos, planner=None, store=None):
         self.maze = maze
-        self.rows, self.cols = len(maze), len(maze[0])
         self.position = self.find_valid_position(tuple(player_pos))
+        self.store = store  # Optional ObstacleStore mirroring this obstacle's position
+        self.slot = store.add(self.position, KILLER_OBSTACLE) if store is not None else None
         self.original_cell = ' '
         self.move_timer = 0
         self.move_delay = 1500  # Slightly faster than regular obstacles
-        self.visible = True  # For invisibility power-up
+        self.route = PlannedRoute(planner) if planner else None
         
     def find_valid_position(self, player_pos):
+        rows, cols = len(self.maze), len(self.maze[0])
         start = (1, 0)
-        end = (self.rows - 2, self.cols - 1)
+        end = (rows - 2, cols - 1)
         
         # Place killer obstacles farther from player
         for _ in range(20):
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             
             if (self.maze[x][y] == ' ' and 
                 manhattan_distance((x, y), player_pos) > 8 and  # Farther than regular obstacles
                 (x, y) != start and (x, y) != end):
                 
                 original = self.maze[x][y]
-                self.maze[x][y] = 'K'  # Mark as killer
+                set_cell(self.maze, x, y, 'K')  # Mark as killer
                 
                 if bfs(self.maze, player_pos, end):
-                    self.maze[x][y] = original
+                    set_cell(self.maze, x, y, original)
                     return (x, y)
                 
-                self.maze[x][y] = original
+                set_cell(self.maze, x, y, original)
         
         while True:
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             if (self.maze[x][y] == ' ' and 
                 manhattan_distance((x, y), player_pos) > 5):
                 return (x, y)
@@ -440,24 +2089,31 @@ class KillerObstacle:
             self.move_timer = current_time
             self.move(tuple(player_pos))
     
+    def next_update_time(self):
+        return self.move_timer + self.move_delay
+    
     def move(self, player_pos):
-        end = (self.rows - 2, self.cols - 1)
+        rows, cols = len(self.maze), len(self.maze[0])
+        end = (rows - 2, cols - 1)
         
         x, y = self.position
-        self.maze[x][y] = self.original_cell
+        set_cell(self.maze, x, y, self.original_cell)
         
         # Killer obstacles are more aggressive - 90% chance to move towards player
-        if random.random() < 0.9:
-            path = astar(self.maze, self.position, player_pos)
-            if path and len(path) > 1:
+        if rng.obstacles.random() < 0.9:
+            if self.route:
+                path = self.route.update(self.maze, self.position, player_pos)
+            else:
+                path = plan_path(self.maze, self.position, player_pos)
+            if path and len(path) > 1 and self.maze[path[1][0]][path[1][1]] != '#':
                 next_pos = path[1]
             else:
                 directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                random.shuffle(directions)
+                rng.obstacles.shuffle(directions)
                 next_pos = self.position
                 for dx, dy in directions:
                     nx, ny = x + dx, y + dy
-                    if (is_valid(nx, ny, self.rows, self.cols) and 
+                    if (is_valid(nx, ny, rows, cols) and 
                         self.maze[nx][ny] == ' ' and
                         (nx, ny) != player_pos and 
                         (nx, ny) != end):
@@ -465,11 +2121,11 @@ class KillerObstacle:
                         break
         else:
             directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            random.shuffle(directions)
+            rng.obstacles.shuffle(directions)
             next_pos = self.position
             for dx, dy in directions:
                 nx, ny = x + dx, y + dy
-                if (is_valid(nx, ny, self.rows, self.cols) and 
+                if (is_valid(nx, ny, rows, cols) and 
                     self.maze[nx][ny] == ' ' and
                     (nx, ny) != player_pos and 
                     (nx, ny) != end):
@@ -480,26 +2136,30 @@ class KillerObstacle:
         self.original_cell = self.maze[new_x][new_y]
         
         # Mark as killer obstacle in maze
-        self.maze[new_x][new_y] = 'K'
+        set_cell(self.maze, new_x, new_y, 'K')
         self.position = next_pos
+        if self.store is not None:
+            self.store.move(self.slot, next_pos)
 
 # New class for power-ups
 class PowerUp:
+    __slots__ = ('maze', 'position', 'type', 'active')
+    
     def __init__(self, maze, player_pos):
         self.maze = maze
-        self.rows, self.cols = len(maze), len(maze[0])
         self.position = self.find_valid_position(tuple(player_pos))
-        self.type = random.choice(['speed', 'invisibility', 'time'])
+        self.type = rng.layout.choice(['speed', 'invisibility', 'time'])
         self.active = True
         
     def find_valid_position(self, player_pos):
+        rows, cols = len(self.maze), len(self.maze[0])
         start = (1, 0)
-        end = (self.rows - 2, self.cols - 1)
+        end = (rows - 2, cols - 1)
         
         # Try to place power-ups strategically
         for _ in range(30):
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             
             # Place power-ups on empty spaces, not too close to start or end
             if (self.maze[x][y] == ' ' and 
@@ -510,35 +2170,267 @@ class PowerUp:
                 # Check if no obstacle is at this position
                 if self.maze[x][y] not in ['O', 'K', 'P']:
                     # Mark as power-up
-                    self.maze[x][y] = 'P'
+                    set_cell(self.maze, x, y, 'P')
                     return (x, y)
         
         # Fallback if no ideal position found
         while True:
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             if self.maze[x][y] == ' ':
-                self.maze[x][y] = 'P'
+                set_cell(self.maze, x, y, 'P')
                 return (x, y)
     
     def collect(self):
         """Player collected this power-up"""
         if self.active:
             x, y = self.position
-            self.maze[x][y] = ' '  # Remove from maze
+            set_cell(self.maze, x, y, ' ')  # Remove from maze
             self.active = False
             return self.type
         return None
 
+class TickScheduler:
+    """Priority queue of entity wake-up times, so entities with nothing to do cost nothing per frame"""
+    def __init__(self):
+        self.queue = []     # (wake time, sequence, entity)
+        self.handlers = {}  # entity -> handler(current_time)
+        self.pending = {}   # entity -> sequence of its live queue entry
+        self.sequence = 0
+    
+    def register(self, entity, handler):
+        """Run handler whenever entity.next_update_time() comes due"""
+        self.handlers[entity] = handler
+        self.reschedule(entity)
+    
+    def unregister(self, entity):
+        self.handlers.pop(entity, None)
+        self.pending.pop(entity, None)
+    
+    def reschedule(self, entity):
+        """Re-read an entity's wake-up time after something outside the scheduler changed it"""
+        if entity not in self.handlers:
+            return
+        wake_time = entity.next_update_time()
+        if wake_time is None:
+            self.pending.pop(entity, None)
+            return
+        
+        # Older entries for the entity stay in the heap and are skipped when popped
+        self.sequence += 1
+        self.pending[entity] = self.sequence
+        heapq.heappush(self.queue, (wake_time, self.sequence, entity))
+    
+    def run_due(self, current_time):
+        """Run every entity whose wake-up time has passed, each at most once, and return them"""
+        fired = []
+        while self.queue and self.queue[0][0] <= current_time:
+            wake_time, sequence, entity = heapq.heappop(self.queue)
+            if self.pending.get(entity) != sequence:
+                continue
+            del self.pending[entity]
+            self.handlers[entity](current_time)
+            fired.append(entity)
+        
+        for entity in fired:
+            self.reschedule(entity)
+        return fired
+
+class WallClock:
+    """Game time read from pygame's millisecond clock, with frames paced in real time"""
+    realtime = True
+    
+    def __init__(self):
+        self.pacer = pygame.time.Clock()
+    
+    def ticks(self):
+        return pygame.time.get_ticks()
+    
+    def tick(self, fps):
+        """End a frame, sleeping as long as needed to hold fps"""
+        return self.pacer.tick(fps)
+
+class VirtualClock:
+    """Game time that only moves when a frame ends, so headless runs go as fast as the CPU allows"""
+    realtime = False
+    
+    def __init__(self, start=0, frame_ms=None):
+        self.now = start
+        self.frame_ms = frame_ms  # Fixed time per frame, or one frame at the requested rate
+    
+    def ticks(self):
+        return int(self.now)
+    
+    def advance(self, ms):
+        self.now += ms
+    
+    def tick(self, fps):
+        """End a frame by moving time on a frame's worth without sleeping"""
+        step = self.frame_ms if self.frame_ms is not None else 1000 / fps
+        self.now += step
+        return step
+
+class FrameClock:
+    """Holds the wrapped clock's time from its first reading in a frame until the frame ends"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.realtime = clock.realtime
+        self.now = None
+    
+    def ticks(self):
+        if self.now is None:
+            self.now = self.clock.ticks()
+        return self.now
+    
+    def tick(self, fps):
+        self.now = None
+        return self.clock.tick(fps)
+
+# Replay files start with this, then the session seed as 8 bytes and one record per frame
+REPLAY_MAGIC = b'MZRP\x01'
+
+# Directions held keys resolve to, in the order the game checks them; index 0 is standing still
+MOVE_DIRECTIONS = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Bits of FrameInput.presses, one per key or button pressed during the frame
+PRESS_QUIT, PRESS_CLICK, PRESS_ESCAPE, PRESS_HINT, PRESS_MINIMAP = (1 << bit for bit in range(5))
+
+class FrameInput:
+    """Everything the game reads from the player in one frame, and the game time it was read at"""
+    __slots__ = ('ticks', 'direction', 'presses', 'mouse', 'mouse_held', 'changed')
+    
+    def __init__(self, ticks, direction=0, presses=0, mouse=(0, 0), mouse_held=False, changed=False):
+        self.ticks = ticks
+        self.direction = direction  # Index into MOVE_DIRECTIONS
+        self.presses = presses
+        self.mouse = mouse
+        self.mouse_held = mouse_held
+        self.changed = changed  # Whether any event arrived, so a static screen needs redrawing
+    
+    @classmethod
+    def capture(cls, ticks, events):
+        """Read the frame's input from pygame"""
+        presses = 0
+        for event in events:
+            if event.type == pygame.QUIT:
+                presses |= PRESS_QUIT
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                presses |= PRESS_CLICK
+            elif event.type == pygame.KEYDOWN:
+                presses |= {pygame.K_ESCAPE: PRESS_ESCAPE, pygame.K_h: PRESS_HINT,
+                            pygame.K_m: PRESS_MINIMAP}.get(event.key, 0)
+        
+        keys = pygame.key.get_pressed()
+        direction = 0
+        if keys[pygame.K_UP] or keys[pygame.K_w]:
+            direction = 1
+        elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
+            direction = 2
+        elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
+            direction = 3
+        elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+            direction = 4
+        return cls(ticks, direction, presses, tuple(pygame.mouse.get_pos()),
+                   bool(pygame.mouse.get_pressed()[0]), bool(events))
+
+def _pack_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _unpack_varint(data, i):
+    value = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, i
+        shift += 7
+
+class ReplayRecorder:
+    """Writes a session as its seed plus a delta-encoded log of every frame's time and input"""
+    def __init__(self, path, seed):
+        self.path = path
+        self.data = bytearray(REPLAY_MAGIC) + seed.to_bytes(8, 'little')
+        self.last = FrameInput(0)
+    
+    def record(self, frame):
+        # Milliseconds since the last frame, then a byte of held input saying which optional fields follow
+        last = self.last
+        moved = frame.mouse != last.mouse
+        _pack_varint(self.data, frame.ticks - last.ticks)
+        self.data.append(frame.direction | frame.mouse_held << 3 | bool(frame.presses) << 4
+                         | moved << 5 | frame.changed << 6)
+        if frame.presses:
+            self.data.append(frame.presses)
+        if moved:
+            for new, old in zip(frame.mouse, last.mouse):
+                _pack_varint(self.data, (new - old) * 2 if new >= old else (old - new) * 2 - 1)
+        self.last = frame
+    
+    def close(self):
+        with open(self.path, 'wb') as replay_file:
+            replay_file.write(self.data)
+
+class ReplayPlayer:
+    """Plays a recorded session back as both the game clock and the player's input, without waiting"""
+    realtime = False
+    
+    def __init__(self, path):
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+        if not data.startswith(REPLAY_MAGIC):
+            raise ValueError(f"{path} is not a replay file")
+        
+        i = len(REPLAY_MAGIC)
+        self.seed = int.from_bytes(data[i:i + 8], 'little')
+        i += 8
+        self.frames = []
+        frame = FrameInput(0)
+        while i < len(data):
+            delta, i = _unpack_varint(data, i)
+            flags = data[i]
+            i += 1
+            presses = 0
+            if flags & 0x10:
+                presses = data[i]
+                i += 1
+            mouse = frame.mouse
+            if flags & 0x20:
+                moves = []
+                for _ in range(2):
+                    value, i = _unpack_varint(data, i)
+                    moves.append(-((value + 1) // 2) if value & 1 else value // 2)
+                mouse = (mouse[0] + moves[0], mouse[1] + moves[1])
+            frame = FrameInput(frame.ticks + delta, flags & 0x07, presses, mouse, bool(flags & 0x08), bool(flags & 0x40))
+            self.frames.append(frame)
+        self.index = 0
+    
+    def current(self):
+        """Input of the frame being played, or a quit once the log runs out"""
+        if self.index < len(self.frames):
+            return self.frames[self.index]
+        return FrameInput(self.frames[-1].ticks if self.frames else 0, presses=PRESS_QUIT, changed=True)
+    
+    def ticks(self):
+        return self.current().ticks
+    
+    def tick(self, fps):
+        self.index += 1
+        return 0
+
 class GameTimer:
-    def __init__(self, total_time_seconds):
+    def __init__(self, total_time_seconds, clock=None):
+        self.clock = clock or WallClock()
         self.total_time = total_time_seconds * 1000
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.clock.ticks()
         self.time_remaining = self.total_time
         self.low_time_warning = False
     
     def update(self):
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.ticks()
         elapsed = current_time - self.start_time
         self.time_remaining = max(0, self.total_time - elapsed)
         
@@ -551,7 +2443,7 @@ class GameTimer:
         """Add time bonus from power-up"""
         self.time_remaining += seconds * 1000
         # Recalibrate the start time so the display updates properly
-        self.start_time = pygame.time.get_ticks() - (self.total_time - self.time_remaining)
+        self.start_time = self.clock.ticks() - (self.total_time - self.time_remaining)
         
     def is_expired(self):
         return self.time_remaining <= 0
@@ -567,9 +2459,16 @@ class GameTimer:
         screen.blit(timer_text, (WIDTH - 150, HEIGHT - 40))
 
 class HintSystem:
-    def __init__(self, maze):
+    def __init__(self, maze, planner=None):
         self.maze = maze
+        self.planner = planner
+        self.pending = None  # Background plan for a requested hint
+        self.pending_version = None  # Maze version the background plan was asked for, None to leave it uncached
+        self.path_cache = {}  # cell -> (path, index of cell) for paths found at cache_version
+        self.cache_version = None
         self.hint_path = None
+        self.overlay = None  # Hint path in view rendered once, blitted each frame while shown
+        self.overlay_view = None  # (rows, cols, tile size) the overlay was drawn for
         self.hint_display_time = 0
         self.hint_duration = 5000
         self.hint_cooldown = 10000
@@ -577,16 +2476,66 @@ class HintSystem:
         self.hint_count = 0
         self.max_hints = 3
     
-    def request_hint(self, player_pos, current_time):
+    def request_hint(self, player_pos, current_time, deadline=None):
         if (current_time - self.last_hint_time < self.hint_cooldown or 
-            self.hint_count >= self.max_hints):
+            self.hint_count >= self.max_hints or self.pending):
             return False
         
+        # The rest of any earlier shortest path through this cell holds while the walls are unchanged
+        path = self.cached_path(tuple(player_pos))
+        if path:
+            return self.show_hint(path, current_time)
+        
         end = (len(self.maze) - 2, len(self.maze[0]) - 1)
-        path = astar(self.maze, tuple(player_pos), end)
+        if deadline is not None and self.planner:
+            # Shown from update() once the anytime search has had the time left;
+            # its weighted passes needn't be shortest, so it is never cached
+            budget_ms = max(0.0, (deadline - time.perf_counter()) * 1000)
+            self.pending = self.planner.request(self.maze, tuple(player_pos), end, budget_ms=budget_ms)
+            self.pending_version = None
+            return True
+        if deadline is not None:
+            # Best path found by the deadline, shown straight away, and not cached either
+            path = anytime_astar(self.maze, tuple(player_pos), end, deadline,
+                                 landmarks=known_landmark_table(self.maze))
+            return self.show_hint(path, current_time)
+        if self.planner:
+            # Shown from update() once the worker has found it
+            self.pending = self.planner.request(self.maze, tuple(player_pos), end)
+            self.pending_version = getattr(self.maze, 'version', None)
+            return True
         
+        path = plan_path(self.maze, tuple(player_pos), end)
+        self.remember(path, getattr(self.maze, 'version', None))
+        return self.show_hint(path, current_time)
+    
+    def cached_path(self, cell):
+        """Rest of a cached path from cell to the exit, or None if the cache has nothing current"""
+        version = getattr(self.maze, 'version', None)
+        if version is None or version != self.cache_version:
+            return None
+        entry = self.path_cache.get(cell)
+        if entry is None:
+            return None
+        path, index = entry
+        return path[index:]
+    
+    def remember(self, path, version):
+        """Cache a plan_path result if it was found for the walls as they are now and is a shortest path"""
+        # Only a shortest path's suffixes are shortest paths from their own cells
+        current = getattr(self.maze, 'version', None)
+        if not path or version is None or version != current or not plans_shortest(self.maze):
+            return
+        if self.cache_version != current:
+            self.path_cache = {}
+            self.cache_version = current
+        for i, cell in enumerate(path):
+            self.path_cache.setdefault(tuple(cell), (path, i))
+    
+    def show_hint(self, path, current_time):
         if path:
             self.hint_path = path
+            self.overlay = None
             self.hint_display_time = current_time
             self.last_hint_time = current_time
             self.hint_count += 1
@@ -594,21 +2543,47 @@ class HintSystem:
         return False
     
     def update(self, current_time):
+        if self.pending and self.pending.done():
+            path = self.pending.result()
+            self.remember(path, self.pending_version)
+            self.show_hint(path, current_time)
+            self.pending = None
+        
         if self.hint_path and current_time - self.hint_display_time > self.hint_duration:
             self.hint_path = None
+            self.overlay = None
     
-    def draw(self, screen, tile_size):
+    def next_update_time(self):
+        """Next frame while a hint is being planned, then when the shown hint expires"""
+        if self.pending:
+            return 0
         if self.hint_path:
-            for i, (row, col) in enumerate(self.hint_path):
-                ratio = i / max(1, len(self.hint_path) - 1)
-                color = (int(255 * ratio), 255, int(255 * (1 - ratio)))
-                
-                padding = tile_size // 4
-                rect_size = tile_size - padding * 2
-                pygame.draw.rect(screen, color, 
-                                (col * tile_size + padding, 
-                                 row * tile_size + padding, 
-                                 rect_size, rect_size))
+            return self.hint_display_time + self.hint_duration + 1
+        return None
+    
+    def render_overlay(self, camera):
+        """Draw the hint cells in the camera's view once, onto a transparent surface covering just that view"""
+        rows, cols, tile_size = camera.rows_visible, camera.cols_visible, camera.tile_size
+        self.overlay = pygame.Surface((len(cols) * tile_size, len(rows) * tile_size), pygame.SRCALPHA)
+        self.overlay_view = (rows, cols, tile_size)
+        
+        padding = tile_size // 4
+        rect_size = tile_size - padding * 2
+        for i, (row, col) in enumerate(self.hint_path):
+            if row not in rows or col not in cols:
+                continue
+            ratio = i / max(1, len(self.hint_path) - 1)
+            color = (int(255 * ratio), 255, int(255 * (1 - ratio)))
+            pygame.draw.rect(self.overlay, color, 
+                            ((col - cols.start) * tile_size + padding, 
+                             (row - rows.start) * tile_size + padding, 
+                             rect_size, rect_size))
+    
+    def draw(self, screen, camera):
+        if self.hint_path:
+            if self.overlay is None or self.overlay_view != (camera.rows_visible, camera.cols_visible, camera.tile_size):
+                self.render_overlay(camera)
+            screen.blit(self.overlay, camera.to_screen(camera.rows_visible.start, camera.cols_visible.start))
 
 # Enhanced difficulty manager with level-based features
 class DifficultyManager:
@@ -652,7 +2627,8 @@ class DifficultyManager:
 
 # Class to manage active power-ups
 class PowerUpManager:
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.clock = clock or WallClock()
         self.active_powerups = {} 
         self.speed_multiplier = 1.0
         
@@ -679,6 +2655,10 @@ class PowerUpManager:
             if powerup_type == 'speed':
                 self.speed_multiplier = 1.0
     
+    def next_update_time(self):
+        """Earliest power-up expiry, or None when nothing is active"""
+        return min(self.active_powerups.values(), default=None)
+    
     def is_active(self, powerup_type):
         """Check if a specific power-up is active"""
         return powerup_type in self.active_powerups
@@ -691,7 +2671,7 @@ class PowerUpManager:
     
     def draw(self, screen, font):
         """Draw active power-ups on screen"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.ticks()
         y_offset = 70  # Start position below hints
         
         for powerup_type in self.active_powerups:
@@ -716,21 +2696,23 @@ class PowerUpManager:
             y_offset += 20
 # First, let's add the missing SpecialPowerUp class that was referenced but not defined
 class SpecialPowerUp:
+    __slots__ = ('maze', 'position', 'type', 'active')
+    
     def __init__(self, maze, player_pos, ai_pos):
         self.maze = maze
-        self.rows, self.cols = len(maze), len(maze[0])
         self.position = self.find_valid_position(tuple(player_pos), tuple(ai_pos))
-        self.type = random.choice(['teleport', 'trap', 'wall_phase'])
+        self.type = rng.layout.choice(['teleport', 'trap', 'wall_phase'])
         self.active = True
         
     def find_valid_position(self, player_pos, ai_pos):
+        rows, cols = len(self.maze), len(self.maze[0])
         start = (1, 0)
-        end = (self.rows - 2, self.cols - 1)
+        end = (rows - 2, cols - 1)
         
         # Try to place special power-ups strategically - farther from both players
         for _ in range(30):
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             
             if (self.maze[x][y] == ' ' and 
                 (x, y) != start and (x, y) != end and
@@ -740,22 +2722,22 @@ class SpecialPowerUp:
                 # Check if no other element is at this position
                 if self.maze[x][y] not in ['O', 'K', 'P', 'S']:
                     # Mark as special power-up
-                    self.maze[x][y] = 'S'  # S for Special
+                    set_cell(self.maze, x, y, 'S')  # S for Special
                     return (x, y)
         
         # Fallback if no ideal position found
         while True:
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             if self.maze[x][y] == ' ':
-                self.maze[x][y] = 'S'
+                set_cell(self.maze, x, y, 'S')
                 return (x, y)
     
     def collect(self):
         """Player or AI collected this power-up"""
         if self.active:
             x, y = self.position
-            self.maze[x][y] = ' '  # Remove from maze
+            set_cell(self.maze, x, y, ' ')  # Remove from maze
             self.active = False
             return self.type
         return None
@@ -772,8 +2754,8 @@ def find_random_teleport_location(maze, current_pos):
     
     # Try to find a spot that's not too close to obstacles
     for _ in range(50):
-        x = random.randrange(1, rows - 1)
-        y = random.randrange(1, cols - 1)
+        x = rng.layout.randrange(1, rows - 1)
+        y = rng.layout.randrange(1, cols - 1)
         
         # Ensure it's empty, not an obstacle, power-up, or the exit
         if (maze[x][y] == ' ' and 
@@ -787,8 +2769,8 @@ def find_random_teleport_location(maze, current_pos):
     
     # Fallback to any valid position
     for _ in range(100):  # Try 100 times to find valid position
-        x = random.randrange(1, rows - 1)
-        y = random.randrange(1, cols - 1)
+        x = rng.layout.randrange(1, rows - 1)
+        y = rng.layout.randrange(1, cols - 1)
         if maze[x][y] == ' ' and (x, y) != end:
             return [x, y]
     
@@ -798,7 +2780,7 @@ def find_random_teleport_location(maze, current_pos):
 def add_trap(maze, position):
     """Add a trap at the player's position"""
     x, y = position
-    maze[x][y] = 'T'  # Mark as trap in the maze
+    set_cell(maze, x, y, 'T')  # Mark as trap in the maze
     return (x, y)
 
 def create_wall_phase_path(maze, player_pos, direction):
@@ -810,7 +2792,7 @@ def create_wall_phase_path(maze, player_pos, direction):
     if 0 <= x + dx < len(maze) and 0 <= y + dy < len(maze[0]) and maze[x + dx][y + dy] == '#':
         # Create a temporary opening (will be restored after player passes)
         original_cell = maze[x + dx][y + dy]
-        maze[x + dx][y + dy] = 'W'  # Mark as phased wall
+        set_cell(maze, x + dx, y + dy, 'W')  # Mark as phased wall
         
         # Schedule to close the wall after a few seconds
         return (x + dx, y + dy, original_cell)
@@ -867,9 +2849,13 @@ class SpecialPowerUpManager:
             if powerup_type == 'wall_phase' and maze:
                 for x, y, original_cell in self.wall_phase_cells:
                     if 0 <= x < len(maze) and 0 <= y < len(maze[0]):
-                        maze[x][y] = original_cell
+                        set_cell(maze, x, y, original_cell)
                 self.wall_phase_cells = []
     
+    def next_update_time(self):
+        """Earliest special power-up expiry, or None when nothing is active"""
+        return min(self.active_specials.values(), default=None)
+    
     def check_trap(self, position):
         """Check if position has a trap"""
         for trap_pos in self.traps:
@@ -894,8 +2880,21 @@ class RotatingMazeSection:
         self.rotation_timer = 0
         self.rotation_interval = 10000  # Rotate every 10 seconds
         self.section_cells = self.get_section_cells()
+        self.cell_set = set(self.section_cells)
         self.original_state = self.capture_state()
         
+        # Where each cell goes on a rotation, worked out once
+        permutation = self.rotation_permutation()
+        self.targets = [target for target, source in permutation]
+        self.sources = [source for target, source in permutation]
+    
+    def clone(self, maze):
+        """Copy of this section that rotates maze instead, for lookahead rollouts"""
+        twin = RotatingMazeSection.__new__(RotatingMazeSection)
+        twin.__dict__.update(self.__dict__)
+        twin.maze = maze
+        return twin
+        
     def get_section_cells(self):
         """Get all cells in this rotating section"""
         cells = []
@@ -914,44 +2913,51 @@ class RotatingMazeSection:
             state[(x, y)] = self.maze[x][y]
         return state
     
-    def rotate_section(self):
-    # First capture current state
-        current_state = self.capture_state()
-        
-        # Make a temporary copy to avoid overwriting values
-        new_state = {}
-        
-        # Calculate new positions
+    def rotation_permutation(self):
+        """(target, source) cell pairs for one clockwise quarter turn, leaving the start and exit alone"""
+        rows, cols = len(self.maze), len(self.maze[0])
         cx, cy = self.center
+        pairs = []
         for x, y in self.section_cells:
-            # Calculate position after rotation
-            dx, dy = x - cx, y - cy
-            new_x, new_y = cx + dy, cy - dx
-            
-            # Only update if the new position is valid
-            if (new_x, new_y) in self.section_cells:
-                # Store what will be at the new position
-                if (x, y) in current_state:
-                    cell_value = current_state[(x, y)]
-                    new_state[(new_x, new_y)] = cell_value
-        
-        # Now apply the changes
-        for pos, value in new_state.items():
-            new_x, new_y = pos
-            # Check if position is valid before updating
-            if 0 <= new_x < len(self.maze) and 0 <= new_y < len(self.maze[0]):
-                # Don't overwrite start or end positions
-                if (new_x, new_y) != (1, 0) and (new_x, new_y) != (len(self.maze) - 2, len(self.maze[0]) - 1):
-                    # Preserve special cells like 'S', 'E', 'P', etc.
-                    if self.maze[new_x][new_y] not in ['S', 'E']:
-                        self.maze[new_x][new_y] = value
+            target = (cx + y - cy, cy - x + cx)
+            if target in self.cell_set and target != (1, 0) and target != (rows - 2, cols - 1):
+                pairs.append((target, (x, y)))
+        return pairs
+    
+    def rotate_section(self):
+        """Turn the section a quarter clockwise as one gather of the old cells and one scatter of the new"""
+        maze = self.maze
+        if np is not None and isinstance(maze, np.ndarray) and len(self.section_cells) == (2 * self.radius + 1) ** 2:
+            self.rotate_array(maze)
+            return
         
+        values = [maze[x][y] for x, y in self.sources]
+        for (x, y), value in zip(self.targets, values):
+            current = maze[x][y]
+            # Preserve special cells like 'S', 'E'; set_cell journals any wall that moves
+            if current != value and current not in ('S', 'E'):
+                set_cell(maze, x, y, value)
+    
+    def rotate_array(self, maze):
+        """rot90 the whole block in place on an array-backed grid, keeping the start and exit fixed"""
+        (cx, cy), r = self.center, self.radius
+        block = maze[cx - r:cx + r + 1, cy - r:cy + r + 1]
+        keep = (block == 'S') | (block == 'E')
+        rows, cols = maze.shape
+        for x, y in ((1, 0), (rows - 2, cols - 1)):
+            if (x, y) in self.cell_set:
+                keep[x - cx + r, y - cy + r] = True
+        block[...] = np.where(keep, block, np.rot90(block, -1).copy())
+        
+    def next_update_time(self):
+        return self.rotation_timer + self.rotation_interval
+    
     def update(self, current_time, player_pos, ai_pos):
         """Update the rotating section"""
         if current_time - self.rotation_timer >= self.rotation_interval:
             # Save player and AI positions if they're in the section
-            player_in_section = tuple(player_pos) in self.section_cells
-            ai_in_section = tuple(ai_pos) in self.section_cells
+            player_in_section = tuple(player_pos) in self.cell_set
+            ai_in_section = tuple(ai_pos) in self.cell_set
             
             # Remember positions before rotation
             player_original = tuple(player_pos) if player_in_section else None
@@ -982,17 +2988,26 @@ class ShiftingWall:
         self.rows, self.cols = len(maze), len(maze[0])
         self.orientation = orientation  # 'horizontal' or 'vertical'
         self.position = self.find_valid_position()
-        self.length = random.randint(3, 5)
+        self.length = rng.walls.randint(3, 5)
         self.shift_timer = 0
         self.shift_interval = 5000  # Shift every 5 seconds
+        self.mutation_worker = None  # Escape repairs run here when set
+    
+    def clone(self, maze):
+        """Copy of this wall that shifts maze instead, for lookahead rollouts"""
+        twin = ShiftingWall.__new__(ShiftingWall)
+        twin.__dict__.update(self.__dict__)
+        twin.maze = maze
+        twin.mutation_worker = None
+        return twin
         
     def find_valid_position(self):
         """Find a valid position for the shifting wall"""
         if self.orientation == 'horizontal':
             # Find position for horizontal wall
             for _ in range(30):
-                row = random.randint(3, self.rows - 4)
-                col = random.randint(1, self.cols - 6)
+                row = rng.walls.randint(3, self.rows - 4)
+                col = rng.walls.randint(1, self.cols - 6)
                 
                 # Check if area is suitable
                 valid = True
@@ -1006,8 +3021,8 @@ class ShiftingWall:
         else:
             # Find position for vertical wall
             for _ in range(30):
-                row = random.randint(1, self.rows - 6)
-                col = random.randint(3, self.cols - 4)
+                row = rng.walls.randint(1, self.rows - 6)
+                col = rng.walls.randint(3, self.cols - 4)
                 
                 # Check if area is suitable
                 valid = True
@@ -1025,18 +3040,20 @@ class ShiftingWall:
         else:
             return (1, self.cols // 2)
     
-    def shift(self):
-        """Shift the wall to a new position"""
+    def shift(self, rand=None):
+        """Shift the wall to a new position, returning the cells it walled up; rand picks the direction"""
+        rand = rand or rng.walls
         row, col = self.position
+        walled = []
         
         # Clear current wall
         if self.orientation == 'horizontal':
             for c in range(col, col + self.length):
                 if self.maze[row][c] == '#':
-                    self.maze[row][c] = ' '
+                    set_cell(self.maze, row, c, ' ')
             
             # Determine new position
-            if random.random() < 0.5 and row > 2:
+            if rand.random() < 0.5 and row > 2:
                 # Move up
                 new_row = row - 1
             elif row < self.rows - 3:
@@ -1049,17 +3066,18 @@ class ShiftingWall:
             # Place wall at new position
             for c in range(col, col + self.length):
                 if is_valid(new_row, c, self.rows, self.cols) and self.maze[new_row][c] == ' ':
-                    self.maze[new_row][c] = '#'
+                    set_cell(self.maze, new_row, c, '#')
+                    walled.append((new_row, c))
             
             self.position = (new_row, col)
         else:
             # Vertical wall shifting
             for r in range(row, row + self.length):
                 if self.maze[r][col] == '#':
-                    self.maze[r][col] = ' '
+                    set_cell(self.maze, r, col, ' ')
             
             # Determine new position
-            if random.random() < 0.5 and col > 2:
+            if rand.random() < 0.5 and col > 2:
                 # Move left
                 new_col = col - 1
             elif col < self.cols - 3:
@@ -1072,17 +3090,65 @@ class ShiftingWall:
             # Place wall at new position
             for r in range(row, row + self.length):
                 if is_valid(r, new_col, self.rows, self.cols) and self.maze[r][new_col] == ' ':
-                    self.maze[r][new_col] = '#'
+                    set_cell(self.maze, r, new_col, '#')
+                    walled.append((r, new_col))
             
             self.position = (row, new_col)
+        return walled
+    
+    def cut_bridge(self, walled, positions):
+        """Whether the newly walled cells might have disconnected anything, judged from the area around them"""
+        if any(tuple(position) in walled for position in positions):
+            return True
+        
+        # Every open cell that touched a new wall must still reach the others without it
+        sides = set()
+        for x, y in walled:
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                nx, ny = x + dx, y + dy
+                if is_valid(nx, ny, self.rows, self.cols) and self.maze[nx][ny] != '#':
+                    sides.add((nx, ny))
+        if len(sides) <= 1:
+            return False
+        
+        # Search only a small window around the segment; a detour outside it counts as a cut
+        top = max(0, min(x for x, y in walled) - SHIFT_CHECK_MARGIN)
+        bottom = min(self.rows - 1, max(x for x, y in walled) + SHIFT_CHECK_MARGIN)
+        left = max(0, min(y for x, y in walled) - SHIFT_CHECK_MARGIN)
+        right = min(self.cols - 1, max(y for x, y in walled) + SHIFT_CHECK_MARGIN)
+        
+        start = sides.pop()
+        seen = {start}
+        queue = deque([start])
+        while queue and sides:
+            x, y = queue.popleft()
+            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                nx, ny = x + dx, y + dy
+                if (top <= nx <= bottom and left <= ny <= right and
+                    (nx, ny) not in seen and self.maze[nx][ny] != '#'):
+                    seen.add((nx, ny))
+                    sides.discard((nx, ny))
+                    queue.append((nx, ny))
+        return bool(sides)
+    
+    def next_update_time(self):
+        return self.shift_timer + self.shift_interval
     
     def update(self, current_time, player_pos, ai_pos):
         """Update the shifting wall"""
         if current_time - self.shift_timer >= self.shift_interval:
             self.shift_timer = current_time
-            self.shift()
+            walled = self.shift()
+            
+            # Moving walls can only trap someone if the new segment cut a passage
+            if not self.cut_bridge(walled, [player_pos, ai_pos]):
+                return
             
             # Ensure player and AI aren't trapped
+            if self.mutation_worker:
+                self.mutation_worker.request_repair(self.maze, [player_pos, ai_pos])
+                return
+            
             end = (self.rows - 2, self.cols - 1)
             
             # Check if player is trapped
@@ -1102,46 +3168,78 @@ class CheckpointSystem:
         self.checkpoints = self.create_checkpoints()
         self.player_reached = [False] * checkpoint_count
         self.ai_reached = [False] * checkpoint_count
+        self.fields = []  # Distance field from each checkpoint, then from the exit
+        self.legs = []  # legs[i][j]: maze distance between those two targets
+        self.version = None  # Maze version the distances were computed for
+        self.remaining = {}  # (position, reached flags) -> remaining_distance answer at that version
     
     def create_checkpoints(self):
-        """Create checkpoints throughout the maze"""
+        """Create checkpoints spaced evenly by maze distance along the route from start to exit"""
         checkpoints = []
         end = (self.rows - 2, self.cols - 1)
         start = (1, 0)
         
-        # Find path from start to end
-        path = astar(self.maze, start, end)
-        
-        if path:
-            # Divide path into segments
-            segment_length = len(path) // (self.checkpoint_count + 1)
-            
-            for i in range(1, self.checkpoint_count + 1):
-                idx = i * segment_length
-                if idx < len(path):
-                    checkpoint_pos = path[idx]
-                    # Mark checkpoint in maze
-                    self.maze[checkpoint_pos[0]][checkpoint_pos[1]] = 'C'
-                    checkpoints.append(checkpoint_pos)
-        
-        # If not enough checkpoints were created, add random ones
-        while len(checkpoints) < self.checkpoint_count:
-            for _ in range(20):
-                x = random.randrange(1, self.rows - 1)
-                y = random.randrange(1, self.cols - 1)
-                
-                if (self.maze[x][y] == ' ' and 
-                    (x, y) != start and (x, y) != end and
-                    (x, y) not in checkpoints):
-                    
-                    # Make sure there's a valid path from start to this checkpoint and from here to end
-                    if bfs(self.maze, start, (x, y)) and bfs(self.maze, (x, y), end):
-                        self.maze[x][y] = 'C'
-                        checkpoints.append((x, y))
-                        break
-        
+        # Distances from the start and to the exit answer every placement question below
+        from_start, to_end = distance_matrix(self.maze, [start, end])
+        length = from_start[end[0] * self.cols + end[1]]
+        candidates = [i for i in range(self.rows * self.cols)
+                      if from_start[i] > 0 and to_end[i] > 0 and self.maze[i // self.cols][i % self.cols] == ' ']
+        
+        if length > 0:
+            # For each evenly spaced distance, the free cell nearest to it with the smallest detour
+            best = {}
+            for i in candidates:
+                k = round(from_start[i] * (self.checkpoint_count + 1) / length)
+                if 1 <= k <= self.checkpoint_count:
+                    score = abs(from_start[i] - k * length / (self.checkpoint_count + 1)) + from_start[i] + to_end[i] - length
+                    if k not in best or score < best[k][0]:
+                        best[k] = (score, i)
+            checkpoints = [divmod(best[k][1], self.cols) for k in sorted(best)]
+        
+        # If not enough checkpoints were created, add random ones still connected to start and exit
+        taken = set(checkpoints)
+        candidates = [divmod(i, self.cols) for i in candidates]
+        candidates = [cell for cell in candidates if cell not in taken]
+        rng.layout.shuffle(candidates)
+        while len(checkpoints) < self.checkpoint_count and candidates:
+            checkpoints.append(candidates.pop())
+        
+        for x, y in checkpoints:
+            # Mark checkpoint in maze
+            set_cell(self.maze, x, y, 'C')
         return checkpoints
     
+    def refresh_distances(self):
+        """Recompute distances to each checkpoint and the exit when the walls have changed"""
+        version = getattr(self.maze, 'version', None)
+        if self.fields and version is not None and version == self.version:
+            return
+        targets = self.checkpoints + [(self.rows - 2, self.cols - 1)]
+        self.fields = distance_matrix(self.maze, targets)
+        self.legs = [[field[x * self.cols + y] for x, y in targets] for field in self.fields]
+        self.version = version
+        self.remaining = {}
+    
+    def remaining_distance(self, position, reached):
+        """Maze distance from position through every unreached checkpoint in order to the exit, or None if cut off"""
+        self.refresh_distances()
+        # The UI panel asks every frame, but the answer only changes when a racer moves or a wall does
+        key = (tuple(position), tuple(reached))
+        if key not in self.remaining:
+            self.remaining[key] = self.route_distance(position, reached)
+        return self.remaining[key]
+    
+    def route_distance(self, position, reached):
+        route = [i for i in range(len(self.checkpoints)) if not reached[i]] + [len(self.checkpoints)]
+        total = self.fields[route[0]][position[0] * self.cols + position[1]]
+        if total < 0:
+            return None
+        for a, b in zip(route, route[1:]):
+            if self.legs[a][b] < 0:
+                return None
+            total += self.legs[a][b]
+        return total
+    
     def check_player_progress(self, player_pos):
         """Check if player has reached any checkpoints"""
         pos_tuple = tuple(player_pos)
@@ -1172,10 +3270,10 @@ class CheckpointSystem:
         """Check if AI has reached all checkpoints"""
         return all(self.ai_reached)
     
-    def draw(self, screen, tile_size):
+    def draw(self, screen, tile_size, offset=(0, 0)):
         """Draw checkpoints and progress indicators"""
         for i, (row, col) in enumerate(self.checkpoints):
-            x, y = col * tile_size, row * tile_size
+            x, y = offset[0] + col * tile_size, offset[1] + row * tile_size
             
             # Draw checkpoint
             if self.player_reached[i] and self.ai_reached[i]:
@@ -1200,22 +3298,24 @@ class CheckpointSystem:
 
 # Add a class for competitive sabotage items
 class SabotageItem:
+    __slots__ = ('maze', 'position', 'type', 'active')
+    
     def __init__(self, maze, player_pos, ai_pos):
         self.maze = maze
-        self.rows, self.cols = len(maze), len(maze[0])
         self.position = self.find_valid_position(tuple(player_pos), tuple(ai_pos))
         # Types: 'freeze' - freezes opponent, 'confuse' - reverses controls, 'blind' - limited visibility
-        self.type = random.choice(['freeze', 'confuse', 'blind'])
+        self.type = rng.layout.choice(['freeze', 'confuse', 'blind'])
         self.active = True
         
     def find_valid_position(self, player_pos, ai_pos):
         """Find a valid position for the sabotage item"""
+        rows, cols = len(self.maze), len(self.maze[0])
         start = (1, 0)
-        end = (self.rows - 2, self.cols - 1)
+        end = (rows - 2, cols - 1)
         
         for _ in range(30):
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             
             if (self.maze[x][y] == ' ' and 
                 (x, y) != start and (x, y) != end and
@@ -1223,25 +3323,118 @@ class SabotageItem:
                 manhattan_distance((x, y), ai_pos) > 5):
                 
                 if self.maze[x][y] not in ['O', 'K', 'P', 'S', 'C']:
-                    self.maze[x][y] = 'B'  # B for Sabotage
+                    set_cell(self.maze, x, y, 'B')  # B for Sabotage
                     return (x, y)
         
         # Fallback
         while True:
-            x = random.randrange(1, self.rows - 1)
-            y = random.randrange(1, self.cols - 1)
+            x = rng.layout.randrange(1, rows - 1)
+            y = rng.layout.randrange(1, cols - 1)
             if self.maze[x][y] == ' ':
-                self.maze[x][y] = 'B'
+                set_cell(self.maze, x, y, 'B')
                 return (x, y)
     
     def collect(self):
         """Player or AI collected this sabotage item"""
         if self.active:
             x, y = self.position
-            self.maze[x][y] = ' '
+            set_cell(self.maze, x, y, ' ')
             self.active = False
             return self.type
         return 
+
+# Timed status effects, indexes into StatusEffects.until
+PLAYER_FROZEN, PLAYER_CONFUSED, PLAYER_BLINDED, AI_FROZEN, AI_CONFUSED = range(5)
+
+class StatusEffects:
+    """Expiry time of every status effect in one flat array; an effect is active until its time passes"""
+    __slots__ = ('until',)
+    
+    def __init__(self):
+        self.until = array('q', bytes(8 * 5))
+    
+    def apply(self, effect, current_time, duration):
+        self.until[effect] = current_time + duration
+    
+    def is_active(self, effect, current_time):
+        return current_time < self.until[effect]
+
+class Camera:
+    """Scrolling view that follows the player and limits drawing to the tiles on screen"""
+    __slots__ = ('rows', 'cols', 'width', 'height', 'tile_size', 'offset_x', 'offset_y',
+                 'rows_visible', 'cols_visible')
+    
+    def __init__(self, rows, cols, width=WIDTH, height=HEIGHT):
+        self.rows, self.cols = rows, cols
+        self.width, self.height = width, height
+        self.tile_size = max(MIN_TILE_SIZE, min(height // rows, width // cols))
+        self.follow((1, 1))
+    
+    def _axis_offset(self, cells, span, focus):
+        # Centre a maze that fits, otherwise keep the focus mid-screen without showing past the edges
+        size = cells * self.tile_size
+        if size <= span:
+            return (span - size) // 2
+        return min(0, max(span - size, span // 2 - focus * self.tile_size - self.tile_size // 2))
+    
+    def _axis_range(self, offset, cells, span):
+        first = -offset // self.tile_size - CAMERA_MARGIN
+        last = (span - offset) // self.tile_size + 1 + CAMERA_MARGIN
+        return range(max(0, first), min(cells, last))
+    
+    def follow(self, position):
+        self.offset_y = self._axis_offset(self.rows, self.height, position[0])
+        self.offset_x = self._axis_offset(self.cols, self.width, position[1])
+        self.rows_visible = self._axis_range(self.offset_y, self.rows, self.height)
+        self.cols_visible = self._axis_range(self.offset_x, self.cols, self.width)
+    
+    def on_screen(self, x, y):
+        return x in self.rows_visible and y in self.cols_visible
+    
+    def to_screen(self, x, y):
+        return self.offset_x + y * self.tile_size, self.offset_y + x * self.tile_size
+
+def render_maze_overview(maze):
+    """Whole maze at one pixel per cell, rebuilt only when its walls change"""
+    cached = maze.caches.get('overview') if isinstance(maze, MazeGrid) else None
+    if cached and cached[0] == maze.version:
+        return cached[1]
+    
+    rows, cols = len(maze), len(maze[0])
+    surface = pygame.Surface((cols, rows))
+    if np is not None:
+        # Colour the whole grid in a few array operations and copy it over in one call
+        codes = np.frombuffer(''.join(''.join(row) for row in maze).encode('latin-1'), dtype=np.uint8)
+        codes = codes.reshape(rows, cols)
+        shade = np.minimum(255, 40 + 2 * np.arange(rows))[:, None, None]
+        pixels = np.where((codes == ord('#'))[:, :, None], shade, np.array((30, 30, 40))).astype(np.uint8)
+        pixels[codes == ord('E')] = (255, 100, 100)
+        pygame.surfarray.blit_array(surface, pixels.swapaxes(0, 1))
+    else:
+        surface.fill((30, 30, 40))
+        for row in range(rows):
+            shade = min(255, 40 + row * 2)
+            for col in range(cols):
+                if maze[row][col] == '#':
+                    surface.set_at((col, row), (shade, shade, shade))
+                elif maze[row][col] == 'E':
+                    surface.set_at((col, row), (255, 100, 100))
+    
+    if isinstance(maze, MazeGrid):
+        maze.caches['overview'] = (maze.version, surface)
+    return surface
+
+class GameState:
+    """Everything belonging to the level in play, updated in place rather than repacked each frame"""
+    __slots__ = ('maze', 'player_pos', 'ai_competitor', 'obstacles', 'regular_obstacles', 'killer_obstacles',
+                 'powerups', 'special_powerups', 'sabotage_items', 'rotating_sections', 'shifting_walls',
+                 'game_timer', 'hint_system', 'powerup_manager', 'special_powerup_manager', 'checkpoints',
+                 'maze_update_time', 'last_maze_update', 'status', 'scheduler', 'maze_job', 'camera')
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
 def display_tutorial_screen(screen, tile_size):
     """
     Display a streamlined tutorial/loading screen explaining game elements.
@@ -1446,9 +3639,12 @@ def display_tutorial_screen(screen, tile_size):
     start_time = pygame.time.get_ticks()
     running = True
     countdown_duration = 10  # Reduced from 15 seconds to 10
+    shown_time = None
     
     while running:
-        for event in pygame.event.get():
+        # Sleep until a key is pressed or the countdown reaches its next second
+        first = pygame.event.wait(1000 - (pygame.time.get_ticks() - start_time) % 1000)
+        for event in [first] + pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
@@ -1463,6 +3659,11 @@ def display_tutorial_screen(screen, tile_size):
         if remaining_time <= 0:
             break
         
+        # Only the countdown changes, and only once a second
+        if remaining_time == shown_time:
+            continue
+        shown_time = remaining_time
+        
         # Update countdown timer
         timer_surface = pygame.Surface((180, 35), pygame.SRCALPHA)
         timer_surface.fill((0, 0, 0, 150))
@@ -1475,25 +3676,35 @@ def display_tutorial_screen(screen, tile_size):
         screen.blit(skip_text, (screen_width - 190, 50))
         
         pygame.display.flip()
-        pygame.time.Clock().tick(60)  # Limit to 60 FPS
 
         
 MOVE_DELAY = 100  # Delay between movements (in milliseconds)
 last_move_time = 0  # Initialize the last move time
 
 
-def main():
+def main(game_clock=None, seed=None, record=None, replay=None):
+    """Run the game; pass a VirtualClock to play out levels without waiting on wall time,
+    record to save the session to a replay file, or replay to play one back"""
     global last_move_time
+    
+    # Recorded and replayed sessions must play out identically, so they leave out
+    # everything whose timing the input log can't capture
+    player = ReplayPlayer(replay) if replay else None
+    seed = rng.reseed(player.seed if player else seed)
+    recorder = ReplayRecorder(record, seed) if record else None
+    repeatable = player is not None or recorder is not None
+    
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     tile_size = 32  # Adjust according to your game
-    display_tutorial_screen(screen, tile_size)
+    if not player:
+        display_tutorial_screen(screen, tile_size)
         
     # Display settings
     screen = pygame.display.set_mode((WIDTH, HEIGHT + 60))  # Extra height for UI panel
     pygame.display.set_caption("Dynamic Maze Escape Challenge")
     
-    clock = pygame.time.Clock()
+    game_clock = FrameClock(player or game_clock or WallClock())
     title_font = pygame.font.SysFont('Arial', 32, bold=True)
     header_font = pygame.font.SysFont('Arial', 24, bold=True)
     font = pygame.font.SysFont('Arial', 20)
@@ -1511,6 +3722,20 @@ def main():
     # Initialize difficulty manager
     difficulty = DifficultyManager()
     
+    # Searches for agents and hints run on a background thread
+    planner = PathPlanner(threaded=not repeatable)
+    
+    # Rollouts for the AI's lookahead on harder levels
+    lookahead = MonteCarloLookahead(rollouts=LOOKAHEAD_ROLLOUTS if repeatable else None)
+    
+    # Maze mutations run in a worker process where the platform allows it
+    mutation_worker = None
+    if not repeatable:
+        try:
+            mutation_worker = MazeMutationWorker()
+        except (ImportError, NotImplementedError, OSError):
+            mutation_worker = None
+    
     # Colors for UI
     UI_BG = (40, 44, 52)
     UI_TEXT = (240, 240, 240)
@@ -1540,16 +3765,17 @@ def main():
         
         # Player and AI start at the same position
         player_pos = start_pos.copy()
-        ai_competitor = AICompetitor(maze, start_pos.copy())
+        ai_competitor = AICompetitor(maze, start_pos.copy(), planner)
         
         # Initialize game elements
+        obstacles = ObstacleStore()
         regular_obstacles = []
         for _ in range(settings['obstacles']):
-            regular_obstacles.append(AIObstacle(maze, player_pos))
+            regular_obstacles.append(AIObstacle(maze, player_pos, planner, obstacles))
         
         killer_obstacles = []
         for _ in range(settings['killer_obstacles']):
-            killer_obstacles.append(KillerObstacle(maze, player_pos))
+            killer_obstacles.append(KillerObstacle(maze, player_pos, planner, obstacles))
         
         powerups = []
         for _ in range(settings['powerups']):
@@ -1570,21 +3796,28 @@ def main():
         if settings['level'] >= 3:
             # Add rotating sections based on level
             for _ in range(1 + min(3, settings['level'] // 2)):
-                center_x = random.randint(5, ROWS - 6)
-                center_y = random.randint(5, COLS - 6)
+                center_x = rng.layout.randint(5, ROWS - 6)
+                center_y = rng.layout.randint(5, COLS - 6)
                 rotating_sections.append(RotatingMazeSection(maze, center_x, center_y))
         
         shifting_walls = []
         if settings['level'] >= 4:
             # Add shifting walls based on level
             for _ in range(1 + min(4, settings['level'] // 2)):
-                orientation = random.choice(['horizontal', 'vertical'])
+                orientation = rng.layout.choice(['horizontal', 'vertical'])
                 shifting_walls.append(ShiftingWall(maze, orientation))
+                shifting_walls[-1].mutation_worker = mutation_worker
+        
+        # Harder levels get an AI that plans around the moving parts of the maze
+        if settings['level'] >= LOOKAHEAD_MIN_LEVEL:
+            ai_competitor.lookahead = lookahead
+            ai_competitor.shifting_walls = shifting_walls
+            ai_competitor.rotating_sections = rotating_sections
         
         # Initialize game systems
-        game_timer = GameTimer(settings['time_limit'])
-        hint_system = HintSystem(maze)
-        powerup_manager = PowerUpManager()
+        game_timer = GameTimer(settings['time_limit'], game_clock)
+        hint_system = HintSystem(maze, planner)
+        powerup_manager = PowerUpManager(game_clock)
         special_powerup_manager = SpecialPowerUpManager()
         
         # Checkpoint system (for race mode)
@@ -1595,28 +3828,31 @@ def main():
         
         # Get maze update time
         maze_update_time = settings['maze_update_ms']
-        last_maze_update = pygame.time.get_ticks()
-        
-        # Player status effects
-        player_frozen = False
-        player_frozen_until = 0
-        player_confused = False
-        player_confused_until = 0
-        player_blinded = False
-        player_blinded_until = 0
-        
-        # AI status effects
-        ai_frozen = False
-        ai_frozen_until = 0
-        ai_confused = False
-        ai_confused_until = 0
-        
-        return (maze, player_pos, ai_competitor, regular_obstacles, killer_obstacles, 
-                powerups, special_powerups, sabotage_items, rotating_sections, shifting_walls, 
-                game_timer, hint_system, powerup_manager, special_powerup_manager, checkpoints,
-                maze_update_time, last_maze_update, player_frozen, player_frozen_until,
-                player_confused, player_confused_until, player_blinded, player_blinded_until,
-                ai_frozen, ai_frozen_until, ai_confused, ai_confused_until)
+        last_maze_update = game_clock.ticks()
+        
+        # Timed entities only run when their next wake-up time comes due
+        scheduler = TickScheduler()
+        for obstacle in regular_obstacles + killer_obstacles:
+            scheduler.register(obstacle, lambda now, obstacle=obstacle: obstacle.update(now, player_pos))
+        for section in rotating_sections:
+            scheduler.register(section, lambda now, section=section:
+                               section.update(now, player_pos, ai_competitor.position))
+        for wall in shifting_walls:
+            scheduler.register(wall, lambda now, wall=wall:
+                               wall.update(now, player_pos, ai_competitor.position))
+        scheduler.register(powerup_manager, powerup_manager.update)
+        scheduler.register(special_powerup_manager, lambda now: special_powerup_manager.update(now, maze))
+        scheduler.register(hint_system, hint_system.update)
+        
+        return GameState(maze=maze, player_pos=player_pos, ai_competitor=ai_competitor,
+                         obstacles=obstacles, regular_obstacles=regular_obstacles, killer_obstacles=killer_obstacles,
+                         powerups=powerups, special_powerups=special_powerups, sabotage_items=sabotage_items,
+                         rotating_sections=rotating_sections, shifting_walls=shifting_walls,
+                         game_timer=game_timer, hint_system=hint_system, powerup_manager=powerup_manager,
+                         special_powerup_manager=special_powerup_manager, checkpoints=checkpoints,
+                         maze_update_time=maze_update_time, last_maze_update=last_maze_update,
+                         status=StatusEffects(), scheduler=scheduler, maze_job=None,
+                         camera=Camera(len(maze), len(maze[0])))
     
     # Button class for UI
     class Button:
@@ -1667,7 +3903,7 @@ def main():
         screen.fill((30, 30, 40))
         
         # Draw animated background
-        current_time = pygame.time.get_ticks()
+        current_time = game_clock.ticks()
         for i in range(20):
             shift = int(10 * math.sin(current_time/1000 + i/2))
             pygame.draw.line(screen, (40, 40, 60), (0, i*30 + shift), (WIDTH, i*30 + shift), 4)
@@ -1702,6 +3938,7 @@ def main():
                 "ARROWS / WASD - Move player",
                 "H - Request hint (limited per level)",
                 "ESC - Pause game",
+                "M - Toggle minimap",
                 "",
                 "POWERUPS:",
                 "Speed Boost - Move faster",
@@ -1800,7 +4037,7 @@ def main():
             
             # Show bonus information
             settings = difficulty.get_settings()
-            time_bonus = int(game_timer.time_remaining / 100)
+            time_bonus = int(state.game_timer.time_remaining / 100)
             level_bonus = difficulty.level * 200
             
             # Calculate and display score components
@@ -1821,15 +4058,13 @@ def main():
                 next_level_button.draw(screen)
                 
                 # Get mouse position and check for clicks
-                mouse_pos = pygame.mouse.get_pos()
-                mouse_click = pygame.mouse.get_pressed()[0]
+                mouse_pos, mouse_click = frame.mouse, frame.mouse_held
                 next_level_button.update(mouse_pos)
                 
                 if next_level_button.check_click(mouse_pos, mouse_click):
                     difficulty.next_level()
-                    ai_competitor.scale_with_level(difficulty.level)
-                    game_elements = initialize_game()
-                    return game_elements
+                    state.ai_competitor.scale_with_level(difficulty.level)
+                    return initialize_game()
             
         else:  # AI won
             # AI won text
@@ -1870,8 +4105,7 @@ def main():
         quit_button.draw(screen)
         
         # Get mouse position and check for clicks
-        mouse_pos = pygame.mouse.get_pos()
-        mouse_click = pygame.mouse.get_pressed()[0]
+        mouse_pos, mouse_click = frame.mouse, frame.mouse_held
         
         resume_button.update(mouse_pos)
         controls_button.update(mouse_pos)
@@ -1886,13 +4120,13 @@ def main():
         
         return None
     
-    def draw_ui_panel(maze, player_pos, ai_competitor, game_timer, hint_system, powerup_manager, status_effects):
+    def draw_ui_panel(state):
         # Draw UI panel background
         pygame.draw.rect(screen, UI_BG, (0, HEIGHT, WIDTH, 60))
         
         # Left side - timer and hints
-        game_timer.draw(screen, font)
-        hint_text = font.render(f"HINTS: {hint_system.hint_count}/{hint_system.max_hints}", True, UI_TEXT)
+        state.game_timer.draw(screen, font)
+        hint_text = font.render(f"HINTS: {state.hint_system.hint_count}/{state.hint_system.max_hints}", True, UI_TEXT)
         screen.blit(hint_text, (10, HEIGHT + 30))
         
         # Middle - level and score
@@ -1903,57 +4137,210 @@ def main():
         screen.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT + 30))
         
         # Right side - player position and AI position
-        p_pos_text = small_font.render(f"YOU: ({player_pos[0]},{player_pos[1]})", True, UI_TEXT)
+        p_pos_text = small_font.render(f"YOU: ({state.player_pos[0]},{state.player_pos[1]})", True, UI_TEXT)
         screen.blit(p_pos_text, (WIDTH - 120, HEIGHT + 10))
         
-        ai_pos_text = small_font.render(f"AI: ({ai_competitor.position[0]},{ai_competitor.position[1]})", True, UI_TEXT)
+        ai_pos_text = small_font.render(f"AI: ({state.ai_competitor.position[0]},{state.ai_competitor.position[1]})", True, UI_TEXT)
         screen.blit(ai_pos_text, (WIDTH - 120, HEIGHT + 30))
         
         # Draw status effects if any
-        player_frozen, player_frozen_until, player_confused, player_confused_until, player_blinded, player_blinded_until = status_effects
-        
         status_x = WIDTH//2 + 100
-        current_time = pygame.time.get_ticks()
+        current_time = game_clock.ticks()
         
-        if player_frozen and current_time < player_frozen_until:
+        if state.status.is_active(PLAYER_FROZEN, current_time):
             status_text = small_font.render("FROZEN", True, (100, 200, 255))
             screen.blit(status_text, (status_x, HEIGHT + 10))
             
-        if player_confused and current_time < player_confused_until:
+        if state.status.is_active(PLAYER_CONFUSED, current_time):
             status_text = small_font.render("CONFUSED", True, (200, 100, 255))
             screen.blit(status_text, (status_x + 70, HEIGHT + 10))
             
-        if player_blinded and current_time < player_blinded_until:
+        if state.status.is_active(PLAYER_BLINDED, current_time):
             status_text = small_font.render("BLINDED", True, (255, 255, 100))
             screen.blit(status_text, (status_x + 150, HEIGHT + 10))
         
+        # Race mode - distance each racer still has to cover through their checkpoints
+        if state.checkpoints:
+            player_left = state.checkpoints.remaining_distance(state.player_pos, state.checkpoints.player_reached)
+            ai_left = state.checkpoints.remaining_distance(state.ai_competitor.position, state.checkpoints.ai_reached)
+            race_text = small_font.render(f"TO GO: {player_left if player_left is not None else '?'} / "
+                                          f"AI {ai_left if ai_left is not None else '?'}", True, UI_TEXT)
+            screen.blit(race_text, (status_x, HEIGHT + 30))
+        
         # Draw active powerups
-        powerup_manager.draw(screen, small_font)
+        state.powerup_manager.draw(screen, small_font)
+    
+    def simulate_step(current_time, direction):
+        """Advance the level in play by one fixed step of game time"""
+        global last_move_time
+        nonlocal game_over, level_complete, player_won, ai_won, current_score, collision_check_cell
+        
+        # Update timer
+        time_left = state.game_timer.update()
+        if time_left <= 0:
+            game_over = True
+        
+        # Handle player movement in the direction the keys held this frame point
+        # Skip movement if player is frozen or not enough time has passed
+        if not state.status.is_active(PLAYER_FROZEN, current_time) and current_time - last_move_time > MOVE_DELAY:
+            dx, dy = direction
+        
+            # Apply confusion effect (reverse controls)
+            if state.status.is_active(PLAYER_CONFUSED, current_time):
+                dx, dy = -dx, -dy
+        
+            # Calculate new position
+            if dx != 0 or dy != 0:
+                new_x, new_y = state.player_pos[0] + dx, state.player_pos[1] + dy
+        
+                # Check if new position is valid
+                if is_valid(new_x, new_y) and state.maze[new_x][new_y] != '#':
+                    # Move player
+                    state.player_pos[0], state.player_pos[1] = new_x, new_y
+                    last_move_time = current_time  # update cooldown time
+        
+                    # --- (rest of your powerups, traps, checkpoints, etc.) ---
+                    if new_x == len(state.maze) - 2 and new_y == len(state.maze[0]) - 1:
+                        level_complete = True
+                        player_won = True
+                        current_score += difficulty.calculate_score(state.game_timer.time_remaining / 1000, state.hint_system.hint_count)
+        
+                    for powerup in state.powerups[:]:
+                        if list(powerup.position) == state.player_pos:
+                            powerup_type = powerup.collect()
+                            if powerup_type:
+                                if powerup_type == 'speed':
+                                    state.powerup_manager.activate('speed', current_time, 10000)
+                                elif powerup_type == 'invisibility':
+                                    state.powerup_manager.activate('invisibility', current_time, 8000)
+                                elif powerup_type == 'time':
+                                    state.game_timer.add_time(15)
+                                state.scheduler.reschedule(state.powerup_manager)
+                                state.powerups.remove(powerup)
+        
+                    for special in state.special_powerups[:]:
+                        if list(special.position) == state.player_pos:
+                            special_type = special.collect()
+                            if special_type:
+                                state.special_powerup_manager.activate(special_type, current_time, state.player_pos, state.maze, (dx, dy))
+                                state.scheduler.reschedule(state.special_powerup_manager)
+                                state.special_powerups.remove(special)
+        
+                    for item in state.sabotage_items[:]:
+                        if list(item.position) == state.player_pos:
+                            sabotage_type = item.collect()
+                            if sabotage_type == 'freeze':
+                                state.status.apply(AI_FROZEN, current_time, 5000)
+                            elif sabotage_type == 'confuse':
+                                state.status.apply(AI_CONFUSED, current_time, 7000)
+                            state.sabotage_items.remove(item)
+        
+                    if state.special_powerup_manager.check_trap(state.player_pos):
+                        state.special_powerup_manager.remove_trap(state.player_pos)
+                        state.status.apply(PLAYER_FROZEN, current_time, 3000)
+        
+                    if state.checkpoints:
+                        checkpoint_reached = state.checkpoints.check_player_progress(state.player_pos)
+                        if checkpoint_reached >= 0:
+                            current_score += 100 * (checkpoint_reached + 1)
+        
+        # Run the obstacles, maze sections and power-up timers that are due
+        fired = state.scheduler.run_due(current_time)
+        
+        # Update AI competitor if not frozen
+        if not state.status.is_active(AI_FROZEN, current_time):
+            state.ai_competitor.has_speed_boost = False
+            state.ai_competitor.is_invisible = False
+        
+            # Apply confusion to AI if active
+            original_intelligence = state.ai_competitor.intelligence
+            if state.status.is_active(AI_CONFUSED, current_time):
+                state.ai_competitor.intelligence = 0.2  # Make AI less intelligent when confused
+        
+            # Deadlines follow wall time, which a recorded or replayed session can't reproduce
+            state.ai_competitor.update(current_time, state.player_pos, state.regular_obstacles, state.killer_obstacles,
+                                       None if repeatable else search_deadline(state.maze))
+        
+            # Restore original AI intelligence
+            state.ai_competitor.intelligence = original_intelligence
+        
+            # Check if AI reached end
+            if state.ai_competitor.position[0] == len(state.maze) - 2 and state.ai_competitor.position[1] == len(state.maze[0]) - 1:
+                level_complete = True
+                ai_won = True
+        
+            # Check if AI reached checkpoints
+            if state.checkpoints:
+                state.checkpoints.check_ai_progress(state.ai_competitor.position)
+        
+        # Collisions can only change when something moved or a power-up expired
+        if fired or tuple(state.player_pos) != collision_check_cell:
+            collision_check_cell = tuple(state.player_pos)
+            invisible = state.powerup_manager.is_active('invisibility')
+            state.obstacles.visible = not invisible
+        
+            if not invisible:
+                # Player gets pushed back to start by a regular obstacle
+                if REGULAR_OBSTACLE in state.obstacles.kinds_at(*state.player_pos):
+                    state.player_pos[0], state.player_pos[1] = 1, 1
+        
+                # Game over if hit by killer obstacle
+                if KILLER_OBSTACLE in state.obstacles.kinds_at(*state.player_pos):
+                    game_over = True
+        
+        # Periodically update maze, in the worker process or spread over frames by the main loop
+        if state.maze_job is None and current_time - state.last_maze_update > state.maze_update_time:
+            state.last_maze_update = current_time
+            if mutation_worker:
+                mutation_worker.request_modify(state.maze, state.player_pos, 0.05 + (difficulty.level * 0.01))
+            else:
+                state.maze_job = MazeModificationJob(state.maze, state.player_pos, 0.05 + (difficulty.level * 0.01))
     
-    # Initialize game elements to None
-    game_elements = None
+    # No level in play until the game starts
+    state = None
     paused = False
+    collision_check_cell = None
+    fog_surface = None  # Blind-mode fog, kept until fog_key changes
+    fog_key = None
+    show_minimap = False
+    idle_scene = None  # The level as last drawn, reused under menus and overlays while it cannot change
+    sim_state = None  # Level the simulation clock below belongs to
+    sim_time = 0  # Game time the simulation has reached
+    moved_from = None  # [player cell, AI cell] before each one's latest move, for interpolated drawing
     
     # Main game loop
     running = True
     while running:
-        current_time = pygame.time.get_ticks()
-        mouse_pos = pygame.mouse.get_pos()
-        mouse_click = False
+        # Menus and overlays sleep until input arrives or their animation is due
+        idle = not game_active or paused or game_over or level_complete
+        if idle:
+            first = pygame.event.wait(IDLE_FRAME_MS) if game_clock.realtime else pygame.event.poll()
+            events = pygame.event.get()
+            if first.type != pygame.NOEVENT:
+                events.insert(0, first)
+        else:
+            events = pygame.event.get()
+        
+        # The frame's input comes from the replay being played, or from pygame and into the one being recorded
+        current_time = game_clock.ticks()
+        frame = player.current() if player else FrameInput.capture(current_time, events)
+        if recorder:
+            recorder.record(frame)
+        mouse_pos = frame.mouse
+        mouse_click = bool(frame.presses & PRESS_CLICK)
         
         # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left click
-                    mouse_click = True
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE and game_active:
-                    paused = not paused
-                elif event.key == pygame.K_h and game_active and not paused and not game_over and not level_complete:
-                    # Request hint
-                    game_elements[11].request_hint(game_elements[1], current_time)
+        if frame.presses & PRESS_QUIT:
+            running = False
+        if frame.presses & PRESS_ESCAPE and game_active:
+            paused = not paused
+        if frame.presses & PRESS_MINIMAP and game_active:
+            show_minimap = not show_minimap
+        if frame.presses & PRESS_HINT and game_active and not paused and not game_over and not level_complete:
+            # Request hint
+            if state.hint_system.request_hint(state.player_pos, current_time,
+                                              None if repeatable else search_deadline(state.maze)):
+                state.scheduler.reschedule(state.hint_system)
         
         # Handle mouse movement for button hover
         if not game_active or paused or game_over or level_complete:
@@ -1977,7 +4364,7 @@ def main():
             if menu_state == "main":
                 if start_button.check_click(mouse_pos, mouse_click) == "start_game":
                     menu_state = "main"
-                    game_elements = initialize_game()
+                    state = initialize_game()
                     paused = False
                 elif controls_button.check_click(mouse_pos, mouse_click) == "show_controls":
                     menu_state = "controls"
@@ -2001,7 +4388,7 @@ def main():
             if continue_button.check_click(mouse_pos, mouse_click) == "continue":
                 if level_complete and player_won and difficulty.level < difficulty.max_level:
                     difficulty.next_level()
-                    game_elements = initialize_game()
+                    state = initialize_game()
                 else:
                     game_active = False
                     menu_state = "main"
@@ -2043,174 +4430,55 @@ def main():
                 current_score = 0
                 difficulty.level = 1
         
-        # Game logic
-        if game_active and not paused and not game_over and not level_complete:
-            if game_elements:
-                (maze, player_pos, ai_competitor, regular_obstacles, killer_obstacles, 
-                 powerups, special_powerups, sabotage_items, rotating_sections, shifting_walls, 
-                 game_timer, hint_system, powerup_manager, special_powerup_manager, checkpoints,
-                 maze_update_time, last_maze_update, player_frozen, player_frozen_until,
-                 player_confused, player_confused_until, player_blinded, player_blinded_until,
-                 ai_frozen, ai_frozen_until, ai_confused, ai_confused_until) = game_elements
-                
-                # Update timer
-                time_left = game_timer.update()
-                if time_left <= 0:
-                    game_over = True
-                
-                # Handle player movement using keyboard
-               # Handle player movement using keyboard
-                keys = pygame.key.get_pressed()
-                current_time = pygame.time.get_ticks()  # Ensure this is updated every frame
-
-                # Skip movement if player is frozen or not enough time has passed
-                if not (player_frozen and current_time < player_frozen_until) and current_time - last_move_time > MOVE_DELAY:
-                    dx, dy = 0, 0
-                    if keys[pygame.K_UP] or keys[pygame.K_w]:
-                        dx = -1
-                    elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                        dx = 1
-                    elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                        dy = -1
-                    elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                        dy = 1
-
-                    # Apply confusion effect (reverse controls)
-                    if player_confused and current_time < player_confused_until:
-                        dx, dy = -dx, -dy
-
-                    # Calculate new position
-                    if dx != 0 or dy != 0:
-                        new_x, new_y = player_pos[0] + dx, player_pos[1] + dy
-
-                        # Check if new position is valid
-                        if is_valid(new_x, new_y) and maze[new_x][new_y] != '#':
-                            # Move player
-                            player_pos[0], player_pos[1] = new_x, new_y
-                            last_move_time = current_time  # update cooldown time
-
-                            # --- (rest of your powerups, traps, checkpoints, etc.) ---
-                            if new_x == len(maze) - 2 and new_y == len(maze[0]) - 1:
-                                level_complete = True
-                                player_won = True
-                                current_score += difficulty.calculate_score(game_timer.time_remaining / 1000, hint_system.hint_count)
-
-                            for powerup in powerups[:]:
-                                if list(powerup.position) == player_pos:
-                                    powerup_type = powerup.collect()
-                                    if powerup_type:
-                                        if powerup_type == 'speed':
-                                            powerup_manager.activate('speed', current_time, 10000)
-                                        elif powerup_type == 'invisibility':
-                                            powerup_manager.activate('invisibility', current_time, 8000)
-                                        elif powerup_type == 'time':
-                                            game_timer.add_time(15)
-                                        powerups.remove(powerup)
-
-                            for special in special_powerups[:]:
-                                if list(special.position) == player_pos:
-                                    special_type = special.collect()
-                                    if special_type:
-                                        special_powerup_manager.activate(special_type, current_time, player_pos, maze, (dx, dy))
-                                        special_powerups.remove(special)
-
-                            for item in sabotage_items[:]:
-                                if list(item.position) == player_pos:
-                                    sabotage_type = item.collect()
-                                    if sabotage_type == 'freeze':
-                                        ai_frozen = True
-                                        ai_frozen_until = current_time + 5000
-                                    elif sabotage_type == 'confuse':
-                                        ai_confused = True
-                                        ai_confused_until = current_time + 7000
-                                    sabotage_items.remove(item)
-
-                            if special_powerup_manager.check_trap(player_pos):
-                                special_powerup_manager.remove_trap(player_pos)
-                                player_frozen = True
-                                player_frozen_until = current_time + 3000
-
-                            if checkpoints:
-                                checkpoint_reached = checkpoints.check_player_progress(player_pos)
-                                if checkpoint_reached >= 0:
-                                    current_score += 100 * (checkpoint_reached + 1)
-
-                
-                # Update powerups
-                powerup_manager.update(current_time)
-                special_powerup_manager.update(current_time, maze)
-                
-                # Update AI competitor if not frozen
-                if not (ai_frozen and current_time < ai_frozen_until):
-                    ai_competitor.has_speed_boost = False
-                    ai_competitor.is_invisible = False
-                    
-                    # Apply confusion to AI if active
-                    original_intelligence = ai_competitor.intelligence
-                    if ai_confused and current_time < ai_confused_until:
-                        ai_competitor.intelligence = 0.2  # Make AI less intelligent when confused
-                    
-                    ai_competitor.update(current_time, player_pos, regular_obstacles, killer_obstacles)
-                    
-                    # Restore original AI intelligence
-                    ai_competitor.intelligence = original_intelligence
-                    
-                    # Check if AI reached end
-                    if ai_competitor.position[0] == len(maze) - 2 and ai_competitor.position[1] == len(maze[0]) - 1:
-                        level_complete = True
-                        ai_won = True
-                    
-                    # Check if AI reached checkpoints
-                    if checkpoints:
-                        checkpoints.check_ai_progress(ai_competitor.position)
-                
-                # Update obstacles
-                for obstacle in regular_obstacles:
-                    obstacle.visible = not powerup_manager.is_active('invisibility')
-                    obstacle.update(current_time, player_pos)
-                    
-                    # Check collision with player
-                    if list(obstacle.position) == player_pos and not powerup_manager.is_active('invisibility'):
-                        # Player gets pushed back to start
-                        player_pos[0], player_pos[1] = 1, 1
-                
-                # Update killer obstacles
-                for obstacle in killer_obstacles:
-                    obstacle.visible = not powerup_manager.is_active('invisibility')
-                    obstacle.update(current_time, player_pos)
-                    
-                    # Check collision with player
-                    if list(obstacle.position) == player_pos and not powerup_manager.is_active('invisibility'):
-                        # Game over if hit by killer obstacle
-                        game_over = True
-                
-                # Update rotating sections
-                for section in rotating_sections:
-                    section.update(current_time, player_pos, ai_competitor.position)
-                
-                # Update shifting walls
-                for wall in shifting_walls:
-                    wall.update(current_time, player_pos, ai_competitor.position)
-                
-                # Update hints
-                hint_system.update(current_time)
-                
-                # Periodically update maze
-                if current_time - last_maze_update > maze_update_time:
-                    last_maze_update = current_time
-                    maze = modify_maze_dynamically(maze, player_pos, 0.05 + (difficulty.level * 0.01))
-                    
-                    # Regenerate path to ensure it's still valid
-                    end = (len(maze) - 2, len(maze[0]) - 1)
-                    if not bfs(maze, tuple(player_pos), end):
-                        create_escape_path(maze, tuple(player_pos), end)
-                
-                game_elements = (maze, player_pos, ai_competitor, regular_obstacles, killer_obstacles, 
-                            powerups, special_powerups, sabotage_items, rotating_sections, shifting_walls, 
-                            game_timer, hint_system, powerup_manager, special_powerup_manager, checkpoints,
-                            maze_update_time, last_maze_update, player_frozen, player_frozen_until,
-                            player_confused, player_confused_until, player_blinded, player_blinded_until,
-                            ai_frozen, ai_frozen_until, ai_confused, ai_confused_until)
+        # Game logic runs in fixed steps of game time: several per frame when behind, none when ahead
+        if game_active and not paused and not game_over and not level_complete and state:
+            if state is not sim_state:
+                sim_state, sim_time, moved_from = state, current_time, [None, None]
+            sim_time = max(sim_time, current_time - SIM_STEP_MS * MAX_SIM_STEPS)  # Drop time that can't be caught up
+            
+            # Swap in maze changes the worker process has finished
+            if mutation_worker:
+                mutation_worker.swap_in(state.maze, [state.player_pos, state.ai_competitor.position])
+            
+            # A worker process that died hands its jobs back, and mutations run in-process from then on
+            if mutation_worker and mutation_worker.broken:
+                end = (len(state.maze) - 2, len(state.maze[0]) - 1)
+                for maze, kind, args in mutation_worker.orphans:
+                    if maze is not state.maze:
+                        continue
+                    if kind == 'modify' and state.maze_job is None:
+                        state.maze_job = MazeModificationJob(maze, state.player_pos, args[1])
+                    elif kind == 'repair':
+                        for position in args:
+                            if not bfs(maze, position, end):
+                                create_escape_path(maze, position, end)
+                mutation_worker.shutdown()
+                mutation_worker = None
+                for wall in state.shifting_walls:
+                    wall.mutation_worker = None
+            
+            while current_time - sim_time >= SIM_STEP_MS and not game_over and not level_complete:
+                sim_time += SIM_STEP_MS
+                before = (tuple(state.player_pos), tuple(state.ai_competitor.position))
+                simulate_step(sim_time, MOVE_DIRECTIONS[frame.direction])
+                if before[0] != tuple(state.player_pos):
+                    moved_from[0] = before[0]
+                if before[1] != tuple(state.ai_competitor.position):
+                    moved_from[1] = before[1]
+                elif state.ai_competitor.move_timer == sim_time:
+                    moved_from[1] = None  # Its move came to nothing, so there is nothing to glide from
+            
+            if state.maze_job is not None and state.maze_job.run(None if repeatable else MAZE_UPDATE_BUDGET_MS):
+                state.maze_job = None
+        else:
+            # Paused time is not made up once play resumes
+            sim_state = None
+        
+        # Nothing on a static overlay changes without input, so keep showing the last frame
+        idle = not game_active or paused or game_over or level_complete
+        if game_active and idle and idle_scene is not None and not frame.changed:
+            game_clock.tick(60)
+            continue
         
         # Rendering
         screen.fill((20, 20, 30))  # Dark background color
@@ -2218,75 +4486,80 @@ def main():
         if not game_active:
             menu_state = draw_menu()
         else:
-            if game_elements:
-                (maze, player_pos, ai_competitor, regular_obstacles, killer_obstacles, 
-                powerups, special_powerups, sabotage_items, rotating_sections, shifting_walls, 
-                game_timer, hint_system, powerup_manager, special_powerup_manager, checkpoints,
-                maze_update_time, last_maze_update, player_frozen, player_frozen_until,
-                player_confused, player_confused_until, player_blinded, player_blinded_until,
-                ai_frozen, ai_frozen_until, ai_confused, ai_confused_until) = game_elements
+            if state and idle and idle_scene is not None:
+                screen.blit(idle_scene, (0, 0))
+            elif state:
                 
-                # Calculate tile size based on maze dimensions
-                tile_size = min(HEIGHT // len(maze), WIDTH // len(maze[0]))
+                # Scroll the view to the player; only the tiles it shows get drawn
+                camera = state.camera
+                camera.follow(state.player_pos)
+                tile_size = camera.tile_size
+                offset_x, offset_y = camera.offset_x, camera.offset_y
                 
-                # Center the maze on screen
-                maze_width = len(maze[0]) * tile_size
-                maze_height = len(maze) * tile_size
-                offset_x = (WIDTH - maze_width) // 2
-                offset_y = (HEIGHT - maze_height) // 2
+                # Racers glide from their previous cell over the delay before they can move again
+                def interpolate(start, end, moved_at, delay):
+                    if start is None or sim_state is not state or abs(start[0] - end[0]) + abs(start[1] - end[1]) > 1:
+                        start = end  # Teleports and respawns jump straight there
+                    blend = min(1.0, max(0.0, (current_time - moved_at) / delay))
+                    x, y = camera.to_screen(start[0] + (end[0] - start[0]) * blend, start[1] + (end[1] - start[1]) * blend)
+                    return int(x), int(y)
                 
-                # Create a semi-transparent fog if player is blinded
-                if player_blinded and current_time < player_blinded_until:
-                    fog_surface = pygame.Surface((WIDTH, HEIGHT))
-                    fog_surface.fill((20, 20, 30))
-                    fog_surface.set_alpha(200)  # Semi-transparent
-                    
-                    # Only show area around player when blinded
+                # Semi-transparent fog if player is blinded, rebuilt only when what they can see changes
+                if state.status.is_active(PLAYER_BLINDED, current_time):
                     visible_radius = 3
-                    for row in range(max(0, player_pos[0] - visible_radius), min(len(maze), player_pos[0] + visible_radius + 1)):
-                        for col in range(max(0, player_pos[1] - visible_radius), min(len(maze[0]), player_pos[1] + visible_radius + 1)):
-                            distance = math.sqrt((row - player_pos[0])**2 + (col - player_pos[1])**2)
-                            if distance <= visible_radius:
-                                # Clear fog around player
-                                pygame.draw.rect(fog_surface, (0, 0, 0, 0), 
-                                                (offset_x + col * tile_size, offset_y + row * tile_size, 
-                                                 tile_size, tile_size))
+                    key = (id(state.maze), getattr(state.maze, 'version', None), tuple(state.player_pos),
+                           visible_radius, tile_size, offset_x, offset_y)
+                    if key != fog_key:
+                        fog_key = key
+                        fog_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+                        fog_surface.fill((20, 20, 30, 200))
+                        
+                        # Only show what the player has line of sight to
+                        for row, col in get_field_of_view(state.maze, state.player_pos, visible_radius):
+                            fog_surface.fill((0, 0, 0, 0), (offset_x + col * tile_size, offset_y + row * tile_size,
+                                                            tile_size, tile_size))
                 
-                # Draw maze
-                for row in range(len(maze)):
-                    for col in range(len(maze[0])):
-                        x, y = offset_x + col * tile_size, offset_y + row * tile_size
-                        cell = maze[row][col]
+                # Draw maze, scaling the overview up when tiles are too small for detail
+                if tile_size < DETAIL_MIN_TILE:
+                    rows, cols = camera.rows_visible, camera.cols_visible
+                    area = render_maze_overview(state.maze).subsurface((cols.start, rows.start, len(cols), len(rows)))
+                    screen.blit(pygame.transform.scale(area, (len(cols) * tile_size, len(rows) * tile_size)),
+                                camera.to_screen(rows.start, cols.start))
+                else:
+                    for row in camera.rows_visible:
+                        for col in camera.cols_visible:
+                            x, y = offset_x + col * tile_size, offset_y + row * tile_size
+                            cell = state.maze[row][col]
                         
-                        if cell == '#':
-                            # Draw walls with gradient effect
-                            wall_color = (40, 44, 52)
-                            highlight = min(255, 40 + row * 2)  # Top walls lighter
-                            wall_color = (highlight, highlight, highlight)
-                            pygame.draw.rect(screen, wall_color, (x, y, tile_size, tile_size))
-                            pygame.draw.rect(screen, (60, 64, 72), (x, y, tile_size, tile_size), 1)
-                        elif cell == 'S':
-                            pygame.draw.rect(screen, (0, 200, 100), (x, y, tile_size, tile_size))
-                            pygame.draw.rect(screen, (0, 255, 150), (x + 2, y + 2, tile_size - 4, tile_size - 4))
-                        elif cell == 'E':
-                            pygame.draw.rect(screen, (200, 50, 50), (x, y, tile_size, tile_size))
-                            pygame.draw.rect(screen, (255, 100, 100), (x + 2, y + 2, tile_size - 4, tile_size - 4))
-                        else:
-                            # Empty path with subtle grid pattern
-                            pygame.draw.rect(screen, (30, 30, 40), (x, y, tile_size, tile_size))
-                            pygame.draw.rect(screen, (50, 50, 60), (x, y, tile_size, tile_size), 1)
+                            if cell == '#':
+                                # Draw walls with gradient effect
+                                wall_color = (40, 44, 52)
+                                highlight = min(255, 40 + row * 2)  # Top walls lighter
+                                wall_color = (highlight, highlight, highlight)
+                                pygame.draw.rect(screen, wall_color, (x, y, tile_size, tile_size))
+                                pygame.draw.rect(screen, (60, 64, 72), (x, y, tile_size, tile_size), 1)
+                            elif cell == 'S':
+                                pygame.draw.rect(screen, (0, 200, 100), (x, y, tile_size, tile_size))
+                                pygame.draw.rect(screen, (0, 255, 150), (x + 2, y + 2, tile_size - 4, tile_size - 4))
+                            elif cell == 'E':
+                                pygame.draw.rect(screen, (200, 50, 50), (x, y, tile_size, tile_size))
+                                pygame.draw.rect(screen, (255, 100, 100), (x + 2, y + 2, tile_size - 4, tile_size - 4))
+                            else:
+                                # Empty path with subtle grid pattern
+                                pygame.draw.rect(screen, (30, 30, 40), (x, y, tile_size, tile_size))
+                                pygame.draw.rect(screen, (50, 50, 60), (x, y, tile_size, tile_size), 1)
                 
                 # Draw hints if active
-                if not (player_blinded and current_time < player_blinded_until):
-                    hint_system.draw(screen, tile_size)
+                if not state.status.is_active(PLAYER_BLINDED, current_time):
+                    state.hint_system.draw(screen, camera)
                 
                 # Draw checkpoints if enabled
-                if checkpoints:
-                    checkpoints.draw(screen, tile_size)
+                if state.checkpoints:
+                    state.checkpoints.draw(screen, tile_size, (offset_x, offset_y))
                 
                 # Draw power-ups
-                for powerup in powerups:
-                    if powerup.active:
+                for powerup in state.powerups:
+                    if powerup.active and camera.on_screen(*powerup.position):
                         x, y = offset_x + powerup.position[1] * tile_size, offset_y + powerup.position[0] * tile_size
                         if powerup.type == 'speed':
                             color = (0, 200, 100)
@@ -2305,8 +4578,8 @@ def main():
                         pygame.draw.polygon(screen, (255, 255, 255), points)
                 
                 # Draw special power-ups
-                for special in special_powerups:
-                    if special.active:
+                for special in state.special_powerups:
+                    if special.active and camera.on_screen(*special.position):
                         x, y = offset_x + special.position[1] * tile_size, offset_y + special.position[0] * tile_size
                         if special.type == 'teleport':
                             color = (200, 50, 200)
@@ -2325,8 +4598,8 @@ def main():
                         pygame.draw.polygon(screen, (255, 255, 255), points)
                 
                 # Draw sabotage items
-                for item in sabotage_items:
-                    if item.active:
+                for item in state.sabotage_items:
+                    if item.active and camera.on_screen(*item.position):
                         x, y = offset_x + item.position[1] * tile_size, offset_y + item.position[0] * tile_size
                         pygame.draw.rect(screen, (150, 50, 200), (x, y, tile_size, tile_size))
                         # Draw X shape
@@ -2336,7 +4609,9 @@ def main():
                                         (x + 3 * tile_size // 4, y + tile_size // 4), 2)
                 
                 # Draw traps
-                for trap_pos in special_powerup_manager.traps:
+                for trap_pos in state.special_powerup_manager.traps:
+                    if not camera.on_screen(*trap_pos):
+                        continue
                     x, y = offset_x + trap_pos[1] * tile_size, offset_y + trap_pos[0] * tile_size
                     pygame.draw.rect(screen, (0, 120, 0), (x, y, tile_size, tile_size))
                     # Draw trap symbol
@@ -2345,38 +4620,37 @@ def main():
                     pygame.draw.line(screen, (0, 0, 0), (x + tile_size // 2, y + tile_size // 4),
                                     (x + tile_size // 2, y + 3 * tile_size // 4), 2)
                 
-                # Draw regular obstacles
-                for obstacle in regular_obstacles:
-                    if obstacle.visible:
-                        x, y = offset_x + obstacle.position[1] * tile_size, offset_y + obstacle.position[0] * tile_size
-                        pygame.draw.rect(screen, (100, 100, 120), (x, y, tile_size, tile_size))
-                        # Draw circular obstacle
-                        pygame.draw.circle(screen, (50, 50, 60), (x + tile_size // 2, y + tile_size // 2), tile_size // 3)
-                
-                # Draw killer obstacles
-                for obstacle in killer_obstacles:
-                    if obstacle.visible:
-                        x, y = offset_x + obstacle.position[1] * tile_size, offset_y + obstacle.position[0] * tile_size
-                        pygame.draw.rect(screen, (255, 100, 150), (x, y, tile_size, tile_size))
-                        # Draw skull or danger symbol
-                        pygame.draw.circle(screen, (0, 0, 0), (x + tile_size // 2, y + tile_size // 2), tile_size // 3)
-                        # Eyes
-                        pygame.draw.circle(screen, (255, 255, 255), (x + tile_size // 3, y + tile_size // 3), tile_size // 8)
-                        pygame.draw.circle(screen, (255, 255, 255), (x + 2 * tile_size // 3, y + tile_size // 3), tile_size // 8)
-                        # Mouth
-                        pygame.draw.arc(screen, (255, 255, 255), (x + tile_size // 4, y + tile_size // 2, tile_size // 2, tile_size // 3), 0, 3.14159, 2)
+                # Draw obstacles in one pass over the obstacle store
+                if state.obstacles.visible:
+                    for ox, oy, kind in state.obstacles.cells():
+                        if not camera.on_screen(ox, oy):
+                            continue
+                        x, y = offset_x + oy * tile_size, offset_y + ox * tile_size
+                        if kind == REGULAR_OBSTACLE:
+                            pygame.draw.rect(screen, (100, 100, 120), (x, y, tile_size, tile_size))
+                            # Draw circular obstacle
+                            pygame.draw.circle(screen, (50, 50, 60), (x + tile_size // 2, y + tile_size // 2), tile_size // 3)
+                        else:
+                            pygame.draw.rect(screen, (255, 100, 150), (x, y, tile_size, tile_size))
+                            # Draw skull or danger symbol
+                            pygame.draw.circle(screen, (0, 0, 0), (x + tile_size // 2, y + tile_size // 2), tile_size // 3)
+                            # Eyes
+                            pygame.draw.circle(screen, (255, 255, 255), (x + tile_size // 3, y + tile_size // 3), tile_size // 8)
+                            pygame.draw.circle(screen, (255, 255, 255), (x + 2 * tile_size // 3, y + tile_size // 3), tile_size // 8)
+                            # Mouth
+                            pygame.draw.arc(screen, (255, 255, 255), (x + tile_size // 4, y + tile_size // 2, tile_size // 2, tile_size // 3), 0, 3.14159, 2)
                 
                 # Draw player
-                player_x, player_y = offset_x + player_pos[1] * tile_size, offset_y + player_pos[0] * tile_size
+                player_x, player_y = interpolate(moved_from and moved_from[0], state.player_pos, last_move_time, MOVE_DELAY)
                 # Player glow effect
-                if powerup_manager.is_active('speed'):
+                if state.powerup_manager.is_active('speed'):
                     glow_radius = tile_size * 1.5
                     glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
                     pygame.draw.circle(glow_surface, (0, 200, 100, 100), (glow_radius, glow_radius), glow_radius)
                     screen.blit(glow_surface, (player_x + tile_size//2 - glow_radius, player_y + tile_size//2 - glow_radius))
                 
                 # Draw invisibility effect
-                if powerup_manager.is_active('invisibility'):
+                if state.powerup_manager.is_active('invisibility'):
                     # Semi-transparent player when invisible
                     s = pygame.Surface((tile_size, tile_size), pygame.SRCALPHA)
                     s.fill((50, 100, 255, 150))
@@ -2389,9 +4663,10 @@ def main():
                 pygame.draw.circle(screen, (0, 0, 0), (player_x + tile_size // 2, player_y + tile_size // 2), tile_size // 3, 2)
                 
                 # Draw AI competitor
-                ai_x, ai_y = offset_x + ai_competitor.position[1] * tile_size, offset_y + ai_competitor.position[0] * tile_size
+                ai_x, ai_y = interpolate(moved_from and moved_from[1], state.ai_competitor.position,
+                                   state.ai_competitor.move_timer, state.ai_competitor.get_move_delay())
                 # AI status effects
-                if ai_frozen and current_time < ai_frozen_until:
+                if state.status.is_active(AI_FROZEN, current_time):
                     # Ice effect when frozen
                     s = pygame.Surface((tile_size, tile_size), pygame.SRCALPHA)
                     s.fill((200, 200, 255, 200))
@@ -2407,30 +4682,53 @@ def main():
                 ])
                 
                 # Apply fog effect if player is blinded
-                if player_blinded and current_time < player_blinded_until:
+                if state.status.is_active(PLAYER_BLINDED, current_time):
                     screen.blit(fog_surface, (0, 0))
                 
+                # Whole-maze minimap when toggled on or when the view scrolls, unless blinded
+                elif show_minimap or len(camera.rows_visible) < camera.rows or len(camera.cols_visible) < camera.cols:
+                    scale = MINIMAP_SIZE / max(camera.rows, camera.cols)
+                    minimap = pygame.transform.scale(render_maze_overview(state.maze),
+                                                     (int(camera.cols * scale), int(camera.rows * scale)))
+                    map_x, map_y = WIDTH - minimap.get_width() - 10, 10
+                    screen.blit(minimap, (map_x, map_y))
+                    pygame.draw.rect(screen, UI_ACCENT, (map_x - 1, map_y - 1, minimap.get_width() + 2,
+                                                         minimap.get_height() + 2), 1)
+                    
+                    # Racers and the part of the maze on screen
+                    for (row, col), color in ((state.player_pos, (50, 100, 255)),
+                                              (state.ai_competitor.position, (200, 50, 50))):
+                        pygame.draw.circle(screen, color, (map_x + int((col + 0.5) * scale),
+                                                           map_y + int((row + 0.5) * scale)), 2)
+                    pygame.draw.rect(screen, UI_HIGHLIGHT, (map_x + int(camera.cols_visible.start * scale),
+                                                            map_y + int(camera.rows_visible.start * scale),
+                                                            max(1, int(len(camera.cols_visible) * scale)),
+                                                            max(1, int(len(camera.rows_visible) * scale))), 1)
+                
                 # Draw UI elements
-                status_effects = (player_frozen, player_frozen_until, player_confused, 
-                                  player_confused_until, player_blinded, player_blinded_until)
-                draw_ui_panel(maze, player_pos, ai_competitor, game_timer, hint_system, 
-                              powerup_manager, status_effects)
+                draw_ui_panel(state)
                 
                 # Draw pause instructions
                 pause_text = small_font.render("Press ESC to pause", True, (200, 200, 200))
                 screen.blit(pause_text, (10, HEIGHT + 45))
                 
+                # Overlays go on top of this frame until the level moves again
+                if idle:
+                    idle_scene = screen.copy()
+            
+            if state:
+                
                 # Draw game over overlay
                 if game_over:
                     result = draw_game_over()
                     if result:
-                        game_elements = result
+                        state = result
                 
                 # Draw level complete overlay
                 if level_complete:
                     result = draw_level_complete()
                     if result:
-                        game_elements = result
+                        state = result
                 
                 # Handle pause overlay
                 if paused:
@@ -2438,11 +4736,26 @@ def main():
                     if pause_result == "resume":
                         paused = False
         
+        if not idle:
+            idle_scene = None
+        
         pygame.display.flip()
-        clock.tick(60)
+        game_clock.tick(60)
     
+    if recorder:
+        recorder.close()
+    planner.shutdown()
+    lookahead.shutdown()
+    if mutation_worker:
+        mutation_worker.shutdown()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Dynamic Maze Escape Challenge")
+    parser.add_argument('--seed', type=int, help="seed every random stream for a repeatable session")
+    parser.add_argument('--record', metavar='FILE', help="save the session to a replay file")
+    parser.add_argument('--replay', metavar='FILE', help="play a replay file back as fast as it will run")
+    args = parser.parse_args()
+    main(seed=args.seed, record=args.record, replay=args.replay)
                                         
\ No newline at end of file